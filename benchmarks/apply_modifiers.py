@@ -0,0 +1,57 @@
+"""
+Time ConTextMarkup.applyModifiers (including updateScopes) on whole-report
+sized markups.
+
+    python benchmarks/apply_modifiers.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.tagObject import tagObject, counterTagIDs
+
+REPEATS = 5
+SCOPE = 60
+
+
+def make_tags(num_tags, seed=0):
+    rng = random.Random(seed)
+    items = [itemData.contextItem(["no", "DEFINITE_NEGATED_EXISTENCE", "", "forward"]),
+             itemData.contextItem(["history", "HISTORICAL", "", "backward"]),
+             itemData.contextItem(["but", "CONJ", "", "terminate"]),
+             itemData.contextItem(["embolism", "PULMONARY_EMBOLISM", "", ""])]
+    tag_ids = counterTagIDs()
+    tags = []
+    for i in range(num_tags):
+        item = rng.choice(items)
+        mode = "target" if item.getParsedRule() is itemData.Rule.NONE else "modifier"
+        start = rng.randint(0, 20*num_tags)
+        # modifiers look a sentence or so ahead (or back)
+        tag = tagObject(item, mode, tagid=tag_ids(),
+                        scope=(max(0, start-SCOPE), start+SCOPE))
+        tag.setSpan((start, start+rng.randint(2, 10)))
+        tags.append((tag, mode))
+    return tags
+
+
+def apply_modifiers(tags):
+    markup = ConTextMarkup()
+    for tag, mode in tags:
+        markup.add_node(tag, category=mode)
+    markup.applyModifiers()
+
+
+def main():
+    for num_tags in (100, 400, 1600):
+        tags = make_tags(num_tags)
+        seconds = timeit.timeit(lambda: apply_modifiers(tags), number=REPEATS)
+        print("applyModifiers on {0} marks: {1:.2f} ms".format(num_tags, 1e3*seconds/REPEATS))
+
+
+if __name__ == "__main__":
+    main()
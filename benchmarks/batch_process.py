@@ -0,0 +1,42 @@
+"""
+Time batch.process over a synthetic corpus of reports, in the calling process
+(workers=0) and with pools of worker processes.
+
+    python benchmarks/batch_process.py [num_documents]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP import batch
+
+KB = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "KB"))
+
+REPORT = (
+    "IMPRESSION: Evaluation limited by lack of IV contrast; however, no evidence of "
+    "bowel obstruction or mass identified within the abdomen or pelvis. "
+    "Non-specific interstitial opacities and bronchiectasis seen at the right base, "
+    "suggestive of post-inflammatory changes. "
+    "No definite pneumothorax, no pleural effusion and no evidence of pulmonary embolism. "
+    "New opacity at the left lower lobe consistent with pneumonia.")
+
+
+def main():
+    num_documents = int(sys.argv[1]) if sys.argv[1:] else 200
+    modifiers = itemData.CompiledLexicon(
+        itemData.get_items(os.path.join(KB, "lexical_kb_05042016.yml")))
+    targets = itemData.CompiledLexicon(
+        itemData.get_items(os.path.join(KB, "utah_crit.yml")))
+    documents = [REPORT]*num_documents
+    for workers in sorted(set([0, 1, os.cpu_count() or 1])):
+        start = time.perf_counter()
+        batch.process(documents, modifiers, targets, workers=workers, chunksize=16)
+        elapsed = time.perf_counter() - start
+        print("workers={0}: {1:.1f} documents/s".format(workers, num_documents/elapsed))
+
+
+if __name__ == "__main__":
+    main()
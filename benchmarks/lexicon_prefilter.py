@@ -0,0 +1,60 @@
+"""
+Time ItemMatcher.finditems on clinical sentences with the KB lexicons and with
+a large synthetic lexicon of regular expressions (most of which match none of
+the sentences), reporting how many items are run on each sentence.
+
+    python benchmarks/lexicon_prefilter.py [num_items]
+"""
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.matcher import ItemMatcher
+
+KB = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "KB"))
+
+REPEATS = 3
+
+SENTENCES = [
+    "IMPRESSION: Evaluation limited by lack of IV contrast; however, no evidence of "
+    "bowel obstruction or mass identified within the abdomen or pelvis.",
+    "No definite pneumothorax, no pleural effusion and no evidence of pulmonary embolism.",
+    "New opacity at the left lower lobe consistent with pneumonia & atelectasis (< 1 cm)."]*100
+
+
+def synthetic_items(num_items):
+    """return num_items contextItems with regular expressions such as
+    r"\\bqzkfe(s|al)?\\s+(of\\s+)?[a-z]+"""
+    rnd = random.Random(0)
+    items = []
+    for i in range(num_items):
+        stem = "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 9)))
+        items.append(itemData.contextItem(
+            [stem, "SYNTHETIC", r"\b{0}(s|al)?\s+(of\s+)?[a-z]+".format(stem), ""]))
+    return items
+
+
+def run(name, matcher):
+    seconds = timeit.timeit(lambda: [matcher.finditems(s) for s in SENTENCES], number=REPEATS)
+    anchored = [len(matcher.getAnchoredItems(s)) for s in SENTENCES] \
+        if hasattr(matcher, "getAnchoredItems") else []
+    print("{0}: {1} items, {2:.1f} ms per 1000 sentences, {3:.1f} anchored items run per sentence".format(
+        name, len(matcher), 1e3*seconds/REPEATS/len(SENTENCES)*1000,
+        sum(anchored)/len(SENTENCES) if anchored else float("nan")))
+
+
+def main():
+    num_items = int(sys.argv[1]) if sys.argv[1:] else 10000
+    kb_items = itemData.get_items(os.path.join(KB, "lexical_kb_05042016.yml")) + \
+               itemData.get_items(os.path.join(KB, "utah_crit.yml"))
+    run("KB lexicons", ItemMatcher(kb_items))
+    run("synthetic lexicon", ItemMatcher(synthetic_items(num_items)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare the per-sentence cost of the ConTextMarkup (NetworkX) and
+ConTextMarkupLite backends on the standard pipeline, run step by step and
+with the fused pipeline.markup_sentence.
+
+    python benchmarks/markup_backends.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.ConTextMarkupLite import ConTextMarkupLite
+from pyConTextNLP import pipeline
+
+KB = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "KB"))
+REPEATS = 20
+
+SENTENCES = [
+    "IMPRESSION: Evaluation limited by lack of IV contrast; however, no evidence of "
+    "bowel obstruction or mass identified within the abdomen or pelvis.",
+    "Non-specific interstitial opacities and bronchiectasis seen at the right base, "
+    "suggestive of post-inflammatory changes.",
+    "Probable scarring at the medial aspect of the right lung base, with no definite consolidation.",
+    "No definite pneumothorax, no pleural effusion and no evidence of pulmonary embolism.",
+    "New opacity at the left lower lobe consistent with pneumonia.",
+]
+
+
+def markup_sentence(cls, s, modifiers, targets):
+    markup = cls()
+    markup.setRawText(s)
+    markup.cleanText()
+    markup.markItems(modifiers, mode="modifier")
+    markup.markItems(targets, mode="target")
+    markup.pruneMarks()
+    markup.dropMarks('Exclusion')
+    markup.applyModifiers()
+    markup.pruneSelfModifyingRelationships()
+    markup.dropInactiveModifiers()
+    return markup
+
+
+def main():
+    modifiers = itemData.CompiledLexicon(
+        itemData.get_items(os.path.join(KB, "lexical_kb_05042016.yml")))
+    targets = itemData.CompiledLexicon(
+        itemData.get_items(os.path.join(KB, "utah_crit.yml")))
+    for cls in (ConTextMarkup, ConTextMarkupLite):
+        elapsed = timeit.timeit(lambda: [markup_sentence(cls, s, modifiers, targets)
+                                         for s in SENTENCES], number=REPEATS)
+        print("{0}: {1:.1f} us/sentence".format(cls.__name__,
+                                              1e6*elapsed/REPEATS/len(SENTENCES)))
+        elapsed = timeit.timeit(lambda: [pipeline.markup_sentence(s, modifiers, targets,
+                                                                  markup_class=cls)
+                                         for s in SENTENCES], number=REPEATS)
+        print("{0} (fused): {1:.1f} us/sentence".format(cls.__name__,
+                                                      1e6*elapsed/REPEATS/len(SENTENCES)))
+
+
+if __name__ == "__main__":
+    main()
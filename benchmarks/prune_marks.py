@@ -0,0 +1,50 @@
+"""
+Time ConTextMarkup.pruneMarks on sentences with many overlapping candidate
+marks.
+
+    python benchmarks/prune_marks.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.tagObject import tagObject, counterTagIDs
+
+REPEATS = 20
+
+
+def make_tags(num_tags, seed=0):
+    rng = random.Random(seed)
+    item = itemData.contextItem(["no", "DEFINITE_NEGATED_EXISTENCE", "", "forward"])
+    tag_ids = counterTagIDs()
+    tags = []
+    for i in range(num_tags):
+        mode = rng.choice(["target", "modifier"])
+        tag = tagObject(item, mode, tagid=tag_ids())
+        start = rng.randint(0, 2*num_tags)
+        tag.setSpan((start, start+rng.randint(0, 15)))
+        tags.append((tag, mode))
+    return tags
+
+
+def prune(tags):
+    markup = ConTextMarkup()
+    for tag, mode in tags:
+        markup.add_node(tag, category=mode)
+    markup.pruneMarks()
+
+
+def main():
+    for num_tags in (50, 200, 800):
+        tags = make_tags(num_tags)
+        seconds = timeit.timeit(lambda: prune(tags), number=REPEATS)
+        print("pruneMarks on {0} marks: {1:.1f} us".format(num_tags, 1e6*seconds/REPEATS))
+
+
+if __name__ == "__main__":
+    main()
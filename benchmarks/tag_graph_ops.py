@@ -0,0 +1,51 @@
+"""
+Time the NetworkX operations the ConText pipeline performs on tagObject nodes
+(add_node, add_edge, predecessors, remove_node).
+
+    python benchmarks/tag_graph_ops.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import networkx as nx
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.tagObject import tagObject
+
+NUM_TAGS = 50
+REPEATS = 200
+
+
+def make_tags():
+    item = itemData.contextItem(["no", "DEFINITE_NEGATED_EXISTENCE", "", "forward"])
+    tags = []
+    for i in range(NUM_TAGS):
+        tag = tagObject(item, "modifier", scope=(0, 1000))
+        tag.setSpan((i*10, i*10+2))
+        tag.setPhrase("no")
+        tags.append(tag)
+    return tags
+
+
+def graph_operations(tags):
+    graph = nx.DiGraph()
+    graph.add_nodes_from(tags, category="modifier")
+    for tag1, tag2 in zip(tags, tags[1:]):
+        graph.add_edge(tag1, tag2)
+    for tag in tags:
+        list(graph.predecessors(tag))
+    graph.remove_nodes_from(tags[::2])
+
+
+def main():
+    tags = make_tags()
+    hashing = timeit.timeit(lambda: [hash(tag) for tag in tags], number=REPEATS)
+    operations = timeit.timeit(lambda: graph_operations(tags), number=REPEATS)
+    print("hash {0} tags: {1:.1f} us".format(NUM_TAGS, 1e6*hashing/REPEATS))
+    print("graph operations on {0} tags: {1:.1f} us".format(NUM_TAGS, 1e6*operations/REPEATS))
+
+
+if __name__ == "__main__":
+    main()
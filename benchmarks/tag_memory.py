@@ -0,0 +1,51 @@
+"""
+Measure the memory held per tagObject (and per contextItem) with tracemalloc.
+
+    python benchmarks/tag_memory.py
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.tagObject import tagObject
+
+NUM_TAGS = 100000
+
+
+def measure(create):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = create()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return size/len(objects)
+
+
+def make_items():
+    return [itemData.contextItem(["no evidence", "DEFINITE_NEGATED_EXISTENCE", "", "forward"])
+            for i in range(NUM_TAGS)]
+
+
+def make_tags():
+    item = itemData.contextItem(["no evidence", "DEFINITE_NEGATED_EXISTENCE", "", "forward"])
+    tags = []
+    for i in range(NUM_TAGS):
+        tag = tagObject(item, "modifier", tagid=i+1, scope=(0, 100))
+        tag.setSpan((i, i+11))
+        tag.setPhrase("no evidence")
+        tag.setMatchedGroupDictionary({})
+        tags.append(tag)
+    return tags
+
+
+def main():
+    print("bytes per contextItem: {0:.0f}".format(measure(make_items)))
+    print("bytes per tagObject: {0:.0f}".format(measure(make_tags)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Time the XML export of a long document with getXML and with writeXML to a
+file.
+
+    python benchmarks/xml_export.py [num_sentences]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.pipeline import markup_document
+
+KB = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "KB"))
+
+REPEATS = 5
+
+SENTENCES = [
+    "IMPRESSION: Evaluation limited by lack of IV contrast; however, no evidence of "
+    "bowel obstruction or mass identified within the abdomen or pelvis.",
+    "No definite pneumothorax, no pleural effusion and no evidence of pulmonary embolism.",
+    "New opacity at the left lower lobe consistent with pneumonia & atelectasis (< 1 cm)."]
+
+
+def main():
+    num_sentences = int(sys.argv[1]) if sys.argv[1:] else 600
+    modifiers = itemData.CompiledLexicon(
+        itemData.get_items(os.path.join(KB, "lexical_kb_05042016.yml")))
+    targets = itemData.CompiledLexicon(
+        itemData.get_items(os.path.join(KB, "utah_crit.yml")))
+    text = " ".join(SENTENCES[i % len(SENTENCES)] for i in range(num_sentences))
+    document = markup_document(text, modifiers, targets)
+
+    seconds = timeit.timeit(document.getXML, number=REPEATS)
+    print("getXML: {0:.1f} ms".format(1e3*seconds/REPEATS))
+    with tempfile.TemporaryFile("w", encoding="utf-8") as fp:
+        seconds = timeit.timeit(lambda: document.writeXML(fp), number=REPEATS)
+    print("writeXML: {0:.1f} ms".format(1e3*seconds/REPEATS))
+
+
+if __name__ == "__main__":
+    main()
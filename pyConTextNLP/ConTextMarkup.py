@@ -1,18 +1,34 @@
 """
 Module defining ConTextMarkup class
+
+The ConText algorithm itself is implemented in ConTextMarkupMixin against the
+small subset of the NetworkX DiGraph interface it needs (nodes, add_nodes_from,
+add_edge, remove_nodes_from, successors, predecessors, degree, edges).
+ConTextMarkup provides that interface by subclassing nx.DiGraph;
+ConTextMarkupLite provides it with plain sorted lists and adjacency dicts.
+Both keep the ModeIndex of the mixin up to date as nodes are added and removed.
 """
+import bisect
+import collections
+import heapq
+import json
+import operator
 import re
-import uuid
-from . io.xml import xmlScrub
-from . tagObject import tagObject
+from . io.xml import xmlScrub, skeletonParts
+from . tagObject import tagObject, create_tag_id
+from . matcher import ItemMatcher, RegexCache, get_item_regex
+from . itemData import CompiledLexicon, Rule
 
 import networkx as nx
 
 REG_CLEAN1 = re.compile(r"""\W""", re.UNICODE)
 REG_CLEAN2 = re.compile(r"""\s+""", re.UNICODE)
 REG_CLEAN3 = re.compile(r"""\d""", re.UNICODE)
+REG_WORD = re.compile(r"""\S+""", re.UNICODE)
 
-COMPILED_REGEXPRS = {}
+# process wide cache of the regular expressions compiled by markItem
+COMPILED_REGEXPRS = RegexCache()
+IGNORECASE_FLAGS = re.IGNORECASE|re.UNICODE
 
 NODE_XML_SKEL = \
 """
@@ -44,37 +60,163 @@ CONTEXT_MARKUP_XML_SKEL = \
 </ConTextMarkup>
 """
 
+NODE_XML_HEAD, NODE_XML_TAIL = skeletonParts(NODE_XML_SKEL, "{0}")
+CONTEXT_MARKUP_XML_HEAD, CONTEXT_MARKUP_XML_MIDDLE, CONTEXT_MARKUP_XML_TAIL = \
+    skeletonParts(CONTEXT_MARKUP_XML_SKEL, "{2}", "{3}")
+
 
-def create_tag_id():
+def _whitespace_shifts(text, source):
+    """
+    align text with source, the text it was made from by collapsing runs of
+    whitespace (e.g. by cleanText): return the sorted positions of text from
+    which its characters are shifted in source and the shifts, or None when
+    there is no shift or the non whitespace characters of text and source differ
     """
-    get a unique identifier
+    words = list(REG_WORD.finditer(text))
+    sourceWords = list(REG_WORD.finditer(source))
+    if [w.group() for w in words] != [w.group() for w in sourceWords]:
+        return None
+    positions, shifts = [], []
+    shift = 0
+    for word, sourceWord in zip(words, sourceWords):
+        if sourceWord.start() - word.start() != shift:
+            shift = sourceWord.start() - word.start()
+            positions.append(word.start())
+            shifts.append(shift)
+    return (positions, shifts) if positions else None
+
+
+class ModeIndex(object):
     """
-    return uuid.uuid1().int
+    the tags of a markup by ConText mode (e.g. "target", "modifier"), each
+    mode kept sorted by span start (ties in insertion order) as tags are added
+    and removed. The span of a tag must not change while it is indexed.
+    """
+
+
+    def __init__(self):
+        # tag -> (mode, sort key) in insertion order
+        self.__modes = {}
+        # mode -> ([sort keys], [tags]) sorted by key
+        self.__sorted = {}
+        self.__numAdded = 0
+
+
+    def __len__(self):
+        return len(self.__modes)
+
+
+    def __iter__(self):
+        return iter(self.__modes)
+
+
+    def __contains__(self, tag):
+        return tag in self.__modes
+
+
+    def add(self, tag, mode):
+        """index tag under mode; a tag already indexed is moved to mode"""
+        if tag in self.__modes:
+            old_mode, key = self.__modes[tag]
+            if old_mode == mode:
+                return
+            self.__remove_sorted(tag, old_mode, key)
+        else:
+            key = (tag.getSpan()[0], self.__numAdded)
+            self.__numAdded += 1
+        self.__modes[tag] = (mode, key)
+        keys, tags = self.__sorted.setdefault(mode, ([], []))
+        index = bisect.bisect_right(keys, key)
+        keys.insert(index, key)
+        tags.insert(index, tag)
+
+
+    def remove(self, tag):
+        mode, key = self.__modes.pop(tag)
+        self.__remove_sorted(tag, mode, key)
+
+
+    def removeMany(self, tags):
+        """remove the indexed tags among tags"""
+        removed = set(tag for tag in tags if tag in self.__modes)
+        if len(removed) < 2:
+            for tag in removed:
+                self.remove(tag)
+            return
+        modes = set()
+        for tag in removed:
+            modes.add(self.__modes.pop(tag)[0])
+        for mode in modes:
+            keys, tags = self.__sorted[mode]
+            kept = [i for i, tag in enumerate(tags) if tag not in removed]
+            self.__sorted[mode] = ([keys[i] for i in kept], [tags[i] for i in kept])
+
+
+    def __remove_sorted(self, tag, mode, key):
+        keys, tags = self.__sorted[mode]
+        index = bisect.bisect_left(keys, key)
+        del keys[index]
+        del tags[index]
+
+
+    def clear(self):
+        self.__modes.clear()
+        self.__sorted.clear()
+
+
+    def getMode(self, tag):
+        return self.__modes[tag][0]
+
 
+    def items(self):
+        """(tag, mode) pairs in insertion order"""
+        return [(tag, value[0]) for tag, value in self.__modes.items()]
 
 
-class ConTextMarkup(nx.DiGraph):
+    def getNodes(self, mode):
+        """return a new list of the tags of mode sorted by span"""
+        if mode not in self.__sorted:
+            return []
+        return list(self.__sorted[mode][1])
+
+
+    def count(self, mode):
+        if mode not in self.__sorted:
+            return 0
+        return len(self.__sorted[mode][1])
+
+
+class ConTextMarkupMixin(object):
     """
-    base class for context document.
-    build around markedTargets a list of termObjects representing desired terms
-    found in text and markedModifiers, tagObjects found in the text
+    The ConText algorithm for a sentence, shared by ConTextMarkup and
+    ConTextMarkupLite. Classes using the mixin must provide a graph dictionary
+    and the DiGraph methods listed in the module docstring.
     """
 
 
-    def __init__(self, txt='', unicodeEncoding='utf-8'):
-        """txt is the string to parse"""
-        # __document capture the document level structure
-        # for each sentence and then put in the archives when the next sentence
-        # is processed
-        super(ConTextMarkup, self).__init__(__txt=None,
-                                            __rawtxt=txt,
-                                            __scope=None,
-                                            __SCOPEUPDATED=False)
-        self.__document = nx.DiGraph()
-        self.__document.add_node("top", category="document")
+    def __init__(self, unicodeEncoding='utf-8', tagIDs=None):
+        """
+        tagIDs: optional tag id strategy (e.g. a counterTagIDs shared by the
+        markups of a document). Defaults to the process wide strategy"""
         self.__VERBOSE = False
-        self.__tagID = 0
+        self.__tagIDs = tagIDs
         self.__unicodeEncoding = unicodeEncoding
+        self.__modeIndex = ModeIndex()
+
+
+    def getModeIndex(self):
+        """
+        return the ModeIndex of the nodes of the markup
+        """
+        return self.__modeIndex
+
+
+    def getTagIDs(self):
+        """
+        return the tag id strategy of the markup (None for the process wide
+        strategy)
+        """
+        return self.__tagIDs
 
 
     def getUnicodeEncoding(self):
@@ -123,6 +265,46 @@ class ConTextMarkup(nx.DiGraph):
         return self.graph.get("__scope", '')
 
 
+    def setDocumentOffset(self, offset, source=None):
+        """
+        set the offset of the text of the markup in the text of its document
+        (and so the document spans of its tags). source is the text of the
+        document the markup was made from when it differs from the text of the
+        markup by runs of whitespace (see ConTextDocument.addMarkup): the
+        document spans of the tags then skip the collapsed whitespace. Without
+        source the alignment set before (if any) is kept
+        """
+        self.graph["__documentOffset"] = offset
+        if source is not None:
+            self.graph["__documentShifts"] = _whitespace_shifts(self.getText(), source)
+        for node in self.nodes():
+            node.setDocumentOffset(*self.__document_offsets(node.getSpan()))
+
+
+    def __document_offsets(self, span):
+        """
+        return the offsets in the document of the start and of the end of span,
+        a span of the text of the markup
+        """
+        offset = self.getDocumentOffset()
+        shifts = self.graph.get("__documentShifts")
+        if shifts is None:
+            return offset, offset
+        positions, shifts = shifts
+        start = bisect.bisect_right(positions, span[0]) - 1
+        end = bisect.bisect_right(positions, max(span[1] - 1, span[0])) - 1
+        return (offset + (shifts[start] if start >= 0 else 0),
+                offset + (shifts[end] if end >= 0 else 0))
+
+
+    def getDocumentOffset(self):
+        """
+        return the offset of the text of the markup in the text of its
+        document (0 if the markup is not part of a document)
+        """
+        return self.graph.get("__documentOffset", 0)
+
+
     def getScopeUpdated(self):
         """
         return boolean whether the scope has been updated
@@ -137,13 +319,6 @@ class ConTextMarkup(nx.DiGraph):
         return self.graph.get("__rawTxt", '')
 
 
-    def getNumod_byerSentences(self): # !!! Need to rewrite this to match graph
-        """
-        get the numod_byer o sentences in the context
-        """
-        return len(self.__document)
-
-
     def cleanText(self, stripNonAlphaNumeric=False, stripNumod_byers=False):
         """Need to rename. applies the regular expression scrubbers to rawTxt"""
         if stripNonAlphaNumeric:
@@ -166,53 +341,137 @@ class ConTextMarkup(nx.DiGraph):
         """
         return an XML representation of the markup
         """
-        nodes = list(self.nodes(data=True))
-        nodes.sort()
-        node_string = ''
-        for n in nodes:
-            attribute_string = ''
-            keys = list(n[1].keys())
-            keys.sort()
-            for k in keys:
-                attribute_string += """<{0}> {1} </{2}>\n""".format(k, n[1][k], k)
-            modification_string = ''
-            modified_by = self.predecessors(n[0])
-            if modified_by:
-                for mod in modified_by:
-                    modification_string += """<modified_by>\n"""
-                    modification_string += \
-                        """<modifyingNode> %s </modifyingNode>\n"""%mod.getTagID()
-                    modification_string += \
-                        """<modifyingCategory> %s </modifyingCategory>\n"""%mod.getCategory()
-                    modification_string += """</modified_by>\n"""
-            modifies = self.successors(n[0])
-            if modifies:
-                for modified in modifies:
-                    modification_string += """<modifies>\n"""
-                    modification_string += \
-                        """<modifiedNode> {0} </modifiedNode>\n""".format(modified.getTagID())
-                    modification_string += \
-                        """</modifies>\n"""
-            node_string += \
-                    NODE_XML_SKEL.format(attribute_string+"{0}".format(n[0].getXML()) +\
-                        modification_string)
-        edges = list(self.edges(data=True))
-        edges.sort()
-        edge_string = ''
-        for edge in edges:
-            keys = list(edge[2].keys())
-            keys.sort()
-            attribute_string = ''
-            for key in keys:
-                attribute_string += """<{0}> {1} </{2}>\n""".format(key, edge[2][key], key)
-            edge_string += "{0}".format(EDGE_XML_SKEL.format(edge[0].getTagID(),
-                                                             edge[1].getTagID(),
-                                                             attribute_string))
-
-        return CONTEXT_MARKUP_XML_SKEL.format(xmlScrub(self.getRawText()),
-                                              xmlScrub(self.getText()),
-                                              node_string,
-                                              edge_string)
+        return "".join(self.iterXML())
+
+
+    def writeXML(self, fp):
+        """
+        write the XML representation of the markup (see getXML) to the
+        file-like object fp
+        """
+        fp.writelines(self.iterXML())
+
+
+    def iterXML(self):
+        """
+        generate the XML representation of the markup (see getXML) in pieces:
+        the text, then one piece for each node and edge
+        """
+        yield CONTEXT_MARKUP_XML_HEAD.format(xmlScrub(self.getRawText()),
+                                             xmlScrub(self.getText()))
+        for node, attributes in sorted(self.nodes(data=True), key=operator.itemgetter(0)):
+            node_string = [NODE_XML_HEAD]
+            for k in sorted(attributes):
+                node_string.append("""<{0}> {1} </{2}>\n""".format(k, attributes[k], k))
+            node_string.append(node.getXML())
+            for mod in self.predecessors(node):
+                node_string.append("""<modified_by>\n<modifyingNode> %s </modifyingNode>\n"""
+                                   """<modifyingCategory> %s </modifyingCategory>\n</modified_by>\n"""%
+                                   (mod.getTagID(), mod.getCategory()))
+            for modified in self.successors(node):
+                node_string.append("""<modifies>\n<modifiedNode> {0} </modifiedNode>\n</modifies>\n""".format(
+                    modified.getTagID()))
+            node_string.append(NODE_XML_TAIL)
+            yield "".join(node_string)
+        yield CONTEXT_MARKUP_XML_MIDDLE
+        for edge in sorted(self.edges(data=True), key=operator.itemgetter(0, 1)):
+            attribute_string = "".join(["""<{0}> {1} </{2}>\n""".format(key, edge[2][key], key)
+                                        for key in sorted(edge[2])])
+            yield EDGE_XML_SKEL.format(edge[0].getTagID(), edge[1].getTagID(), attribute_string)
+        yield CONTEXT_MARKUP_XML_TAIL
+
+
+    def toDict(self):
+        """
+        return a dictionary of the markup holding only strings, numbers and
+        lists, e.g. to be written as JSON: the texts, the tags (see
+        tagObject.toDict) and the tag ids of the edges. fromDict rebuilds the
+        markup from the dictionary without running the ConText algorithm again
+        """
+        scope = self.getScope()
+        markup = {"rawText": self.getRawText(),
+                  "text": self.getText(),
+                  "scope": list(scope) if scope else None,
+                  "scopeUpdated": bool(self.getScopeUpdated()),
+                  "tags": [tag.toDict() for tag in self.nodes()],
+                  "edges": [list(edge) for edge in self.__edges_in_order()]}
+        if self.getDocumentOffset():
+            markup["documentOffset"] = self.getDocumentOffset()
+        if self.graph.get("__documentShifts"):
+            markup["documentShifts"] = [list(l) for l in self.graph["__documentShifts"]]
+        return markup
+
+
+    def toJSON(self):
+        return json.dumps(self.toDict(), ensure_ascii=False, separators=(",", ":"))
+
+
+    @classmethod
+    def fromDict(cls, markup, unicodeEncoding='utf-8', tagIDs=None, items=None):
+        """
+        rebuild a markup from a dictionary returned by toDict. tagIDs is the
+        tag id strategy of the markup, which gives the rebuilt tags new ids;
+        items an optional dictionary sharing the contextItems of the tags (see
+        tagObject.fromDict)
+        """
+        obj = cls(unicodeEncoding=unicodeEncoding, tagIDs=tagIDs)
+        obj.setRawText(markup["rawText"])
+        obj.graph["__txt"] = markup["text"]
+        obj.graph["__scope"] = tuple(markup["scope"]) if markup["scope"] else markup["scope"]
+        obj.graph["__SCOPEUPDATED"] = markup["scopeUpdated"]
+        if items is None:
+            items = {}
+        # stored id -> rebuilt tag
+        tags = {}
+        for stored in markup["tags"]:
+            tag = tagObject.fromDict(stored, items, tagIDs)
+            tags[stored["id"]] = tag
+            obj.add_node(tag, category=tag.getConTextCategory())
+        for u, v in markup["edges"]:
+            obj.add_edge(tags[u], tags[v])
+        if markup.get("documentShifts"):
+            obj.graph["__documentShifts"] = tuple(markup["documentShifts"])
+        if markup.get("documentOffset") or markup.get("documentShifts"):
+            obj.setDocumentOffset(markup.get("documentOffset", 0))
+        return obj
+
+
+    @classmethod
+    def fromJSON(cls, txt, **kwargs):
+        return cls.fromDict(json.loads(txt), **kwargs)
+
+
+    def __edges_in_order(self):
+        """
+        return the edges (as pairs of tag ids) in an order that, added to an
+        empty markup, gives each node its successors and its predecessors in
+        the current order
+        """
+        edges = [(u.getTagID(), v.getTagID()) for u, v in self.edges()]
+        # an edge waits for the edge before it among the successors of its
+        # start node and for the one before it among the predecessors of its
+        # end node
+        waiting = dict.fromkeys(edges, 0)
+        following = {}
+        for node in self:
+            tagID = node.getTagID()
+            for chain in ([(tagID, v.getTagID()) for v in self.successors(node)],
+                          [(u.getTagID(), tagID) for u in self.predecessors(node)]):
+                for first, second in zip(chain, chain[1:]):
+                    following.setdefault(first, []).append(second)
+                    waiting[second] += 1
+        if not following:
+            return edges
+        ready = collections.deque(edge for edge in edges if not waiting[edge])
+        ordered = []
+        while ready:
+            edge = ready.popleft()
+            ordered.append(edge)
+            for second in following.get(edge, ()):
+                waiting[second] -= 1
+                if not waiting[second]:
+                    ready.append(second)
+        return ordered
 
 
     def __unicode__(self):
@@ -245,11 +504,9 @@ class ConTextMarkup(nx.DiGraph):
 
     def getConTextModeNodes(self, mode):
         """
-        get the numod_byer of nodes of type mode
+        get the nodes of type mode sorted by span
         """
-        nodes = [n[0] for n in self.nodes(data=True) if n[1]['category'] == mode]
-        nodes.sort()
-        return nodes
+        return self.__modeIndex.getNodes(mode)
 
 
     def updateScopes(self):
@@ -273,63 +530,195 @@ class ConTextMarkup(nx.DiGraph):
 
         # Now limit scope based on the domains of the spans of the other
         # modifier
-        for i in range(len(modifiers)-1):
-            modifier = modifiers[i]
-            for j in range(i+1, len(modifiers)):
-                modifier2 = modifiers[j]
-                if modifier.limitScope(modifier2) and \
-                   modifier2.getRule().lower() == 'terminate':
-                    self.add_edge(modifier2, modifier)
-                if modifier2.limitScope(modifier) and \
-                   modifier.getRule().lower() == 'terminate':
-                    self.add_edge(modifier, modifier2)
-
-
-    def markItems(self, items, mode="target"):
+        self.__limit_scopes(modifiers)
+
+
+    def __limit_scopes(self, modifiers):
+        """
+        limit the scope of each modifier by the spans of the other modifiers
+        and add an edge from each terminating modifier that limited a scope.
+
+        This gives the scopes and edges (in the same order) of calling
+        modifier.limitScope(other) for every pair of modifiers, but looks up
+        the limiting modifiers by bisecting, for every category and for the
+        terminate rule, the modifiers sorted by span start:
+        * a forward (or bidirectional) scope is limited by the first
+          qualifying modifier starting after the modifier
+        * a backward scope is limited by the qualifying modifier ending last
+          among those starting before the modifier; the terminating
+          modifiers that successively limited the scope get an edge
+        """
+        starts = [modifier.getSpan()[0] for modifier in modifiers]
+        ends = [modifier.getSpan()[1] for modifier in modifiers]
+        terminates = [modifier.getParsedRule() is Rule.TERMINATE for modifier in modifiers]
+
+        # indices of the modifiers of each category (and with the terminate
+        # rule), with their span starts and the running maximum span end
+        members = {}
+        for i, modifier in enumerate(modifiers):
+            for category in set(c.lower().strip() for c in modifier.getCategory()):
+                members.setdefault(category, []).append(i)
+            if terminates[i]:
+                members.setdefault(Rule.TERMINATE, []).append(i)
+        member_starts = {}
+        last_ends = {}
+        for key, indices in members.items():
+            member_starts[key] = [starts[i] for i in indices]
+            last = [None]
+            for i in indices:
+                if last[-1] is None or ends[i] > ends[last[-1]]:
+                    last.append(i)
+                else:
+                    last.append(last[-1])
+            last_ends[key] = last
+
+        def last_end_before(key, index):
+            """the member of key ending last among those before index"""
+            return last_ends[key][bisect.bisect_left(members[key], index)]
+
+        # terminating modifiers ending after every preceding terminating
+        # modifier: the only ones that can limit a backward scope
+        records = [i for i in members.get(Rule.TERMINATE, [])
+                   if last_end_before(Rule.TERMINATE, i) is None or
+                   ends[i] > ends[last_end_before(Rule.TERMINATE, i)]]
+
+        edges = []
+        for m, modifier in enumerate(modifiers):
+            rule = modifier.getParsedRule()
+            if rule is not Rule.FORWARD and rule is not Rule.BIDIRECTIONAL and \
+               rule is not Rule.BACKWARD:
+                continue
+            keys = [key for key in members
+                    if key is not Rule.TERMINATE and modifier.isA(key)]
+            if Rule.TERMINATE in members:
+                keys.append(Rule.TERMINATE)
+            if rule is Rule.BACKWARD:
+                bound = bisect.bisect_left(starts, starts[m])
+                for i in records:
+                    if i >= bound:
+                        break
+                    if ends[i] > modifier.getScope()[0] and \
+                       all(last_end_before(key, i) is None or
+                           ends[i] > ends[last_end_before(key, i)] for key in keys
+                           if key is not Rule.TERMINATE) and \
+                       modifier.limitScope(modifiers[i]):
+                        edges.append(((i, m, 1), modifiers[i], modifier))
+                last = [last_end_before(key, bound) for key in keys]
+                last = [i for i in last if i is not None]
+                if last:
+                    modifier.limitScope(modifiers[max(last, key=lambda i: (ends[i], -i))])
+            else:
+                first = [members[key][bisect.bisect_right(member_starts[key], starts[m])]
+                         for key in keys
+                         if bisect.bisect_right(member_starts[key], starts[m]) < len(members[key])]
+                if first:
+                    i = min(first)
+                    if modifier.limitScope(modifiers[i]) and terminates[i]:
+                        edges.append(((m, i, 0), modifiers[i], modifier))
+        edges.sort(key=lambda edge: edge[0])
+        for key, modifier2, modifier in edges:
+            self.add_edge(modifier2, modifier)
+
+
+    def markItems(self, items, mode="target", cache=None):
         """tags the sentence for a list of items
-        items: a list of contextItems"""
+        items: a list of contextItems, an ItemMatcher built from a list of
+        contextItems or a CompiledLexicon. An ItemMatcher (or CompiledLexicon)
+        finds the matches for all the items in a single pass over the text.
+        cache: RegexCache used to compile the regular expressions of the items.
+        Defaults to the process wide COMPILED_REGEXPRS"""
+        self.add_nodes_from(self.findItems(items, mode, cache), category=mode)
+
+
+    def findItems(self, items, mode="target", cache=None):
+        """
+        return the tags markItems would add to the markup for items, in the
+        same order, without adding them
+        """
         if not items:
-            return
+            return []
+        if isinstance(items, CompiledLexicon):
+            items = items.getMatcher()
+        tags = []
+        if isinstance(items, ItemMatcher):
+            if not self.getText():
+                self.cleanText()
+            for item, matches in items.finditems(self.getText()):
+                tags.extend(self.__tag_matches(item, matches, mode))
+            return tags
         for item in items:
-            self.add_nodes_from(self.markItem(item, ConTextMode=mode), category=mode)
+            tags.extend(self.markItem(item, ConTextMode=mode, cache=cache))
+        return tags
 
 
-    def markItem(self, item, ConTextMode="target", ignoreCase=True):
+    def runPipeline(self, modifiers, targets, dropCategory="exclusion",
+                    pruneInactive=True, cache=None):
+        """
+        run the ConText algorithm on the text of the markup. The result is that
+        of calling
+            markItems(modifiers, mode="modifier")
+            markItems(targets, mode="target")
+            pruneMarks()
+            dropMarks(dropCategory) (unless dropCategory is None)
+            applyModifiers()
+            pruneSelfModifyingRelationships()
+            dropInactiveModifiers() (if pruneInactive)
+        but the marks pruneMarks and dropMarks would remove are never added to
+        the markup
+        """
+        marks = [(tag, "modifier") for tag in self.findItems(modifiers, "modifier", cache)] + \
+                [(tag, "target") for tag in self.findItems(targets, "target", cache)]
+        removed = set(self.__encompassed_marks(marks))
+        if dropCategory is not None:
+            removed.update(mark[0] for mark in marks if mark[0].isA(dropCategory))
+        for mode in ("modifier", "target"):
+            self.add_nodes_from([tag for tag, tag_mode in marks
+                                 if tag_mode == mode and tag not in removed],
+                                category=mode)
+        self.applyModifiers()
+        self.pruneSelfModifyingRelationships()
+        if pruneInactive:
+            self.dropInactiveModifiers()
+
+
+    def markItem(self, item, ConTextMode="target", ignoreCase=True, cache=None):
         """
         markup the current text with the current item.
         If ignoreCase is True (default), the regular expression is compiled with
-        IGNORECASE."""
+        IGNORECASE. Compiled regular expressions are kept in cache (defaults to
+        the process wide COMPILED_REGEXPRS)."""
 
         if not self.getText():
             self.cleanText()
 
-        # See if we have already created a regular expression
-
-        if not item.getLiteral() in COMPILED_REGEXPRS:
-            if not item.getRE():
-                reg_exp = r"\b{}\b".format(item.getLiteral())
-                if self.getVerbose():
-                    print("generating regular expression", reg_exp)
-            else:
-                reg_exp = item.getRE()
-                if self.getVerbose():
-                    print("using provided regular expression", reg_exp)
-            if ignoreCase:
-                regex = re.compile(reg_exp, re.IGNORECASE|re.UNICODE)
-            else:
-                regex = re.compile(reg_exp, re.UNICODE)
-            COMPILED_REGEXPRS[item.getLiteral()] = regex
+        if cache is None:
+            cache = COMPILED_REGEXPRS
+        reg_exp = get_item_regex(item)
+        if self.getVerbose():
+            print("using regular expression", reg_exp)
+        if ignoreCase:
+            regex = cache.compile(reg_exp, IGNORECASE_FLAGS)
         else:
-            regex = COMPILED_REGEXPRS[item.getLiteral()]
-        _iter = regex.finditer(self.getText())
+            regex = cache.compile(reg_exp, re.UNICODE)
+        return self.__tag_matches(item, regex.finditer(self.getText()), ConTextMode)
+
+
+    def __tag_matches(self, item, matches, ConTextMode):
+        """
+        create a tagObject for each of the regular expression matches of item
+        """
+        tag_ids = self.__tagIDs or create_tag_id
+        located = self.getDocumentOffset() or self.graph.get("__documentShifts")
         terms = []
-        for i in _iter:
+        for i in matches:
             tag_0 = tagObject(item,
                               ConTextMode,
-                              tagid=create_tag_id(),
+                              tagid=tag_ids(),
                               scope=self.getScope())
-
             tag_0.setSpan(i.span())
+            if located:
+                tag_0.setDocumentOffset(*self.__document_offsets(i.span()))
+
             tag_0.setPhrase(i.group())
             tag_0.setMatchedGroupDictionary(i.groupdict())
             if self.getVerbose():
@@ -343,7 +732,7 @@ class ConTextMarkup(nx.DiGraph):
         prune Marked objects by deleting any objects that lie within the span of
         another object. Currently modifiers and targets are treated separately
         """
-        self.__prune_marks(self.nodes(data=True))
+        self.__prune_marks([(n[0], n[1]['category']) for n in self.nodes(data=True)])
 
 
     def dropInactiveModifiers(self):
@@ -374,10 +763,10 @@ class ConTextMarkup(nx.DiGraph):
         """
         modifiers = self.getConTextModeNodes("modifier")
         for modifier in modifiers:
-            modified_by = self.successors(modifier)
+            modified_by = list(self.successors(modifier))
             if modified_by and len(modified_by) > 1:
                 minm = min([(modifier.dist(mod_by), mod_by) for mod_by in modified_by])
-                edgs = self.edges(modifier)
+                edgs = list(self.edges(modifier))
                 edgs.remove((modifier, minm[1]))
                 if self.getVerbose():
                     print("deleting relationship(s)", edgs)
@@ -407,29 +796,80 @@ class ConTextMarkup(nx.DiGraph):
 
 
     def __prune_marks(self, _marks):
-        if len(_marks) < 2:
-            return
-        # this can surely be done faster
-        marks = list(_marks)
-        marks.sort()
-        nodes_to_remove = []
-        for i in range(len(marks)-1):
-            mark1 = marks[i]
-            if mark1[0] not in nodes_to_remove:
-                for j in range(i+1, len(marks)):
-                    mark2 = marks[j]
-                    if mark1[0].encompasses(mark2[0]) and \
-                       mark1[1]['category'] == mark2[1]['category']:
-                        nodes_to_remove.append(mark2[0])
-                    elif mark2[0].encompasses(mark1[0]) and \
-                         mark2[1]['category'] == mark1[1]['category']:
-                        nodes_to_remove.append(mark1[0])
-                        break
+        removed = self.__encompassed_marks(_marks)
         if self.getVerbose():
             print("pruning the following nodes")
-            for node in nodes_to_remove:
+            for node in removed:
                 print(node)
-        self.remove_nodes_from(nodes_to_remove)
+        self.remove_nodes_from(removed)
+
+
+    def __encompassed_marks(self, _marks):
+        """
+        return the tags of the (tag, ConText mode) marks encompassed by another
+        mark of the same ConText mode.
+
+        The marks are swept once in span start order (ties in node order, as
+        with the former pairwise comparison, whose result this reproduces
+        exactly):
+        * a mark whose span equals the span of a mark removed so far is
+          skipped
+        * otherwise, if a later mark of the same mode has the same start and
+          ends further, the mark and the marks of the same mode in between
+          are removed
+        * otherwise every later mark of the same mode ending no further is
+          removed. These are popped from a per mode heap ordered by span end,
+          so that each mark is visited O(1) times
+        """
+        if len(_marks) < 2:
+            return []
+        marks = sorted(_marks, key=lambda mark: mark[0].getSpan()[0])
+        spans = [mark[0].getSpan() for mark in marks]
+        modes = [mark[1] for mark in marks]
+        nmarks = len(marks)
+
+        # index of the next mark with the same mode and start that ends further
+        longer = [None]*nmarks
+        stacks = {}
+        for i in range(nmarks-1, -1, -1):
+            stack = stacks.setdefault((modes[i], spans[i][0]), [])
+            while stack and spans[stack[-1]][1] <= spans[i][1]:
+                stack.pop()
+            if stack:
+                longer[i] = stack[-1]
+            stack.append(i)
+
+        heaps = {}
+        for i in range(nmarks):
+            heaps.setdefault(modes[i], []).append((spans[i][1], i))
+        for heap in heaps.values():
+            heapq.heapify(heap)
+
+        removed = []
+        removed_spans = set()
+        is_removed = [False]*nmarks
+        def remove(j):
+            if not is_removed[j]:
+                is_removed[j] = True
+                removed.append(marks[j][0])
+                removed_spans.add(spans[j])
+
+        for i in range(nmarks-1):
+            if spans[i] in removed_spans:
+                continue
+            k = longer[i]
+            if k is None:
+                heap = heaps[modes[i]]
+                while heap and heap[0][0] <= spans[i][1]:
+                    j = heapq.heappop(heap)[1]
+                    if j > i:
+                        remove(j)
+            else:
+                for j in range(i+1, k):
+                    if modes[j] == modes[i]:
+                        remove(j)
+                remove(i)
+        return removed
 
 
     def dropMarks(self, category="exclusion"):
@@ -456,38 +896,43 @@ class ConTextMarkup(nx.DiGraph):
             self.updateScopes()
         targets = self.getConTextModeNodes("target")
         modifiers = self.getConTextModeNodes("modifier")
-        for target in targets:
-            for modifier in modifiers:
-                if modifier.applyRule(target):
-                    if self.getVerbose():
-                        print("applying relationship between", modifier, target)
+        # the targets a modifier applies to start within its scope: bisect the
+        # targets sorted by span start. Edges are added modifier by modifier,
+        # which gives each node the same (ordered) successors and
+        # predecessors as adding them target by target
+        starts = [target.getSpan()[0] for target in targets]
+        for modifier in modifiers:
+            rule = modifier.getParsedRule()
+            if rule is Rule.NONE or rule is Rule.TERMINATE:
+                continue
+            scope = modifier.getScope()
+            for target in targets[bisect.bisect_left(starts, scope[0]):
+                                  bisect.bisect_right(starts, scope[1])]:
+                if self.getVerbose():
+                    print("applying relationship between", modifier, target)
 
-                    self.add_edge(modifier, target)
+                self.add_edge(modifier, target)
 
 
     def getMarkedTargets(self):
         """
         Return the list of marked targets in the current sentence. List is sorted by span
         """
-        targets = self.getConTextModeNodes("target")
-        targets.sort()
-        return targets
+        return self.getConTextModeNodes("target")
 
 
     def getNumMarkedTargets(self):
         """
         Return the numod_byer of marked targets in the current sentence
         """
-        return len(self.getConTextModeNodes("target"))
+        return self.__modeIndex.count("target")
 
 
     def getModifiers(self, node):
         """
         return immediate predecessorts of node. The returned list is sorted by node span.
         """
-        modifiers = self.predecessors(node)
-        modifiers.sort()
-        return modifiers
+        return sorted(self.predecessors(node))
 
 
     def isModifiedByCategory(self, node, queryCategory):
@@ -518,3 +963,132 @@ class ConTextMarkup(nx.DiGraph):
         sub_txt = txt[start:end]
         tokens = sub_txt.split()
         return len(tokens)*direction
+
+
+class ConTextMarkup(ConTextMarkupMixin, nx.DiGraph):
+    """
+    base class for context document.
+    build around markedTargets a list of termObjects representing desired terms
+    found in text and markedModifiers, tagObjects found in the text
+    """
+
+
+    def __init__(self, txt='', unicodeEncoding='utf-8', tagIDs=None):
+        """txt is the string to parse
+        tagIDs: optional tag id strategy (e.g. a counterTagIDs shared by the
+        markups of a document). Defaults to the process wide strategy"""
+        # __document capture the document level structure
+        # for each sentence and then put in the archives when the next sentence
+        # is processed
+        nx.DiGraph.__init__(self, __txt=None,
+                            __rawtxt=txt,
+                            __scope=None,
+                            __SCOPEUPDATED=False,
+                            __documentOffset=0)
+        ConTextMarkupMixin.__init__(self, unicodeEncoding, tagIDs)
+        self.__document = nx.DiGraph()
+        self.__document.add_node("top", category="document")
+
+
+    def getNumod_byerSentences(self): # !!! Need to rewrite this to match graph
+        """
+        get the numod_byer o sentences in the context
+        """
+        return len(self.__document)
+
+
+    def toDiGraph(self):
+        """
+        return self: a ConTextMarkup is a NetworkX DiGraph
+        """
+        return self
+
+
+    def getConTextModeNodes(self, mode):
+        """
+        get the nodes of type mode sorted by span
+        """
+        if self.__indexed():
+            return ConTextMarkupMixin.getConTextModeNodes(self, mode)
+        nodes = [n for n, attributes in self.nodes(data=True)
+                 if attributes.get('category') == mode]
+        nodes.sort()
+        return nodes
+
+
+    def getNumMarkedTargets(self):
+        """
+        Return the numod_byer of marked targets in the current sentence
+        """
+        if self.__indexed():
+            return ConTextMarkupMixin.getNumMarkedTargets(self)
+        return len(self.getConTextModeNodes("target"))
+
+
+    def __indexed(self):
+        """
+        whether the ModeIndex covers the nodes of the graph. NetworkX views
+        (subgraph, reverse(copy=False), copy(as_view=True)) share or filter the
+        node data of another graph without going through add_node, so their
+        index is empty and their node data has to be scanned
+        """
+        return type(self._node) is dict and len(self.getModeIndex()) == len(self._node)
+
+
+    # The DiGraph methods adding or removing nodes also update the ModeIndex
+    # of the markup (nodes added by add_edge are indexed with mode None).
+    # NetworkX operators (copy, union, ...) go through these methods.
+    def add_node(self, node_for_adding, **attr):
+        nx.DiGraph.add_node(self, node_for_adding, **attr)
+        self.__index_nodes([node_for_adding])
+
+
+    def add_nodes_from(self, nodes_for_adding, **attr):
+        nodes = list(nodes_for_adding)
+        nx.DiGraph.add_nodes_from(self, nodes, **attr)
+        self.__index_nodes(nodes)
+
+
+    def add_edge(self, u_of_edge, v_of_edge, **attr):
+        num_nodes = len(self._node)
+        nx.DiGraph.add_edge(self, u_of_edge, v_of_edge, **attr)
+        if len(self._node) != num_nodes:
+            index = self.getModeIndex()
+            self.__index_nodes([n for n in (u_of_edge, v_of_edge) if n not in index])
+
+
+    def add_edges_from(self, ebunch_to_add, **attr):
+        edges = list(ebunch_to_add)
+        num_nodes = len(self._node)
+        nx.DiGraph.add_edges_from(self, edges, **attr)
+        if len(self._node) != num_nodes:
+            index = self.getModeIndex()
+            self.__index_nodes(dict.fromkeys(n for e in edges for n in e[:2] if n not in index))
+
+
+    def remove_node(self, n):
+        nx.DiGraph.remove_node(self, n)
+        self.getModeIndex().remove(n)
+
+
+    def remove_nodes_from(self, nodes):
+        nodes = list(nodes)
+        nx.DiGraph.remove_nodes_from(self, nodes)
+        self.getModeIndex().removeMany(nodes)
+
+
+    def clear(self):
+        nx.DiGraph.clear(self)
+        self.getModeIndex().clear()
+
+
+    def __index_nodes(self, nodes):
+        index = self.getModeIndex()
+        for n in nodes:
+            try:
+                attributes = self._node[n]
+            except TypeError:
+                # (node, attribute dict) tuple
+                n = n[0]
+                attributes = self._node[n]
+            index.add(n, attributes.get('category'))
@@ -0,0 +1,173 @@
+"""
+Module defining the ConTextMarkupLite class
+
+ConTextMarkupLite runs the same ConText algorithm as ConTextMarkup (both use
+ConTextMarkupMixin) but does not allocate a NetworkX graph for every sentence.
+Tags are kept in the ModeIndex of the mixin and relationships in adjacency
+dictionaries; toDiGraph converts the markup to a ConTextMarkup when a NetworkX
+graph is needed (e.g. for graph algorithms or ConTextDocument.computeDocumentGraph).
+"""
+from .ConTextMarkup import ConTextMarkupMixin, ConTextMarkup
+
+
+class ConTextMarkupLite(ConTextMarkupMixin):
+    """
+    lightweight markup for a sentence providing the public methods of
+    ConTextMarkup (markItems, pruneMarks, dropMarks, applyModifiers,
+    pruneSelfModifyingRelationships, dropInactiveModifiers,
+    getMarkedTargets, isModifiedByCategory, ...) and the subset of the
+    DiGraph interface used by them.
+    """
+
+
+    def __init__(self, txt='', unicodeEncoding='utf-8', tagIDs=None):
+        """txt is the string to parse
+        tagIDs: optional tag id strategy (e.g. a counterTagIDs shared by the
+        markups of a document). Defaults to the process wide strategy"""
+        self.graph = {"__txt":None,
+                      "__rawtxt":txt,
+                      "__scope":None,
+                      "__SCOPEUPDATED":False,
+                      "__documentOffset":0}
+        ConTextMarkupMixin.__init__(self, unicodeEncoding, tagIDs)
+        # ConText mode ("target", "modifier") of each tag in insertion order
+        self.__index = self.getModeIndex()
+        # adjacency: node -> {neighbor: edge sequence number}
+        self.__succ = {}
+        self.__pred = {}
+        self.__numEdges = 0
+
+
+    def __len__(self):
+        return len(self.__index)
+
+
+    def __iter__(self):
+        return iter(self.__index)
+
+
+    def __contains__(self, node):
+        """as in NetworkX, False for unhashable objects (e.g. lists of nodes)"""
+        try:
+            return node in self.__index
+        except TypeError:
+            return False
+
+
+    def has_node(self, node):
+        return node in self
+
+
+    def number_of_nodes(self):
+        return len(self.__index)
+
+
+    def number_of_edges(self):
+        return sum(len(successors) for successors in self.__succ.values())
+
+
+    def add_node(self, node, category=None):
+        self.add_nodes_from([node], category=category)
+
+
+    def add_nodes_from(self, nodes, category=None):
+        """add nodes with the ConText mode category. The mode of nodes
+        already in the markup is updated"""
+        for node in nodes:
+            if node not in self.__index:
+                self.__succ[node] = {}
+                self.__pred[node] = {}
+            self.__index.add(node, category)
+
+
+    def remove_node(self, node):
+        self.remove_nodes_from([node])
+
+
+    def remove_nodes_from(self, nodes):
+        removed = set()
+        for node in nodes:
+            if node not in self.__index or node in removed:
+                continue
+            removed.add(node)
+            for successor in self.__succ.pop(node):
+                del self.__pred[successor][node]
+            for predecessor in self.__pred.pop(node):
+                if predecessor in self.__succ:
+                    del self.__succ[predecessor][node]
+        self.__index.removeMany(removed)
+
+
+    def add_edge(self, u, v):
+        for node in (u, v):
+            if node not in self.__index:
+                self.add_node(node)
+        if v not in self.__succ[u]:
+            self.__succ[u][v] = self.__pred[v][u] = self.__numEdges
+            self.__numEdges += 1
+
+
+    def remove_edge(self, u, v):
+        del self.__succ[u][v]
+        del self.__pred[v][u]
+
+
+    def remove_edges_from(self, edges):
+        for edge in edges:
+            if edge[0] in self.__succ and edge[1] in self.__succ[edge[0]]:
+                self.remove_edge(edge[0], edge[1])
+
+
+    def has_edge(self, u, v):
+        return u in self.__succ and v in self.__succ[u]
+
+
+    def successors(self, node):
+        return iter(self.__succ[node])
+
+
+    def predecessors(self, node):
+        return iter(self.__pred[node])
+
+
+    def degree(self, node):
+        return len(self.__succ[node]) + len(self.__pred[node])
+
+
+    def nodes(self, data=False):
+        """return the nodes in insertion order; with data, (node, attributes) tuples"""
+        if data:
+            return [(node, {"category":mode}) for node, mode in self.__index.items()]
+        return list(self.__index)
+
+
+    def edges(self, nbunch=None, data=False):
+        """return the edges (out of nbunch if given) in the order of NetworkX"""
+        if nbunch is None:
+            nodes = self.__index
+        elif nbunch in self:
+            nodes = [nbunch]
+        else:
+            nodes = [node for node in nbunch if node in self.__index]
+        if data:
+            return [(u, v, {}) for u in nodes for v in self.__succ[u]]
+        return [(u, v) for u in nodes for v in self.__succ[u]]
+
+
+    def toDiGraph(self):
+        """
+        return the markup as a ConTextMarkup (a NetworkX DiGraph) with the same
+        text, nodes and edges
+        """
+        markup = ConTextMarkup(unicodeEncoding=self.getUnicodeEncoding(),
+                               tagIDs=self.getTagIDs())
+        markup.graph.update(self.graph)
+        if self.getVerbose():
+            markup.toggleVerbose()
+        for node, mode in self.__index.items():
+            markup.add_node(node, category=mode)
+        edges = [(number, u, v) for u, successors in self.__succ.items()
+                 for v, number in successors.items()]
+        edges.sort(key=lambda edge: edge[0])
+        markup.add_edges_from((u, v) for number, u, v in edges)
+        return markup
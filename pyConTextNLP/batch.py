@@ -0,0 +1,154 @@
+#Copyright 2010 Brian E. Chapman
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+"""
+Batch processing of many documents (e.g. radiology reports) in a pool of
+worker processes.
+
+    from pyConTextNLP import batch
+    documents = batch.process(reports, modifiers, targets, workers=8)
+
+Each document is split into sentences and marked up with
+pipeline.markup_document. The lexicons are compiled (CompiledLexicon) and sent
+to each worker once, when the worker starts; documents are then sent to the
+workers in chunks, and at most max_in_flight chunks are pending at a time, so
+that iprocess can stream over corpora that do not fit in memory. Results are
+returned in input order. With an extract function (e.g. stream.findings) the
+workers return extract(document) instead of the document graph.
+"""
+import collections
+import concurrent.futures
+import itertools
+import os
+
+from . import pipeline
+from .itemData import CompiledLexicon
+from .matcher import ItemMatcher
+from .tagObject import counterTagIDs, get_tag_id_strategy, set_tag_id_strategy, worker_tag_ids
+
+# lexicons and options of a worker process, set once by _init_worker
+_WORKER = {}
+
+
+def _compile(items):
+    """compile a list of contextItems into a CompiledLexicon"""
+    if isinstance(items, (CompiledLexicon, ItemMatcher)):
+        return items
+    return CompiledLexicon(items)
+
+
+def _init_worker(modifiers, targets, extract, options):
+    # a forked worker inherits the counter of the parent process
+    if isinstance(get_tag_id_strategy(), counterTagIDs):
+        set_tag_id_strategy(worker_tag_ids())
+    _WORKER["modifiers"] = modifiers
+    _WORKER["targets"] = targets
+    _WORKER["extract"] = extract
+    _WORKER["options"] = options
+
+
+def _markup_documents(documents, modifiers, targets, extract, options):
+    results = []
+    for text in documents:
+        document = pipeline.markup_document(text, modifiers, targets, **options)
+        results.append(document if extract is None else extract(document))
+    return results
+
+
+def _worker_markup_documents(documents):
+    return _markup_documents(documents, _WORKER["modifiers"], _WORKER["targets"],
+                             _WORKER["extract"], _WORKER["options"])
+
+
+def _chunks(documents, chunksize):
+    documents = iter(documents)
+    while True:
+        chunk = list(itertools.islice(documents, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iprocess(documents, modifiers, targets, workers=None, chunksize=8,
+             max_in_flight=None, mp_context=None, extract=None, **options):
+    """
+    generate the ConTextDocument of each text of documents (any iterable of
+    strings) in input order.
+
+    modifiers, targets: lists of contextItems (compiled once into
+    CompiledLexicons), CompiledLexicons or ItemMatchers
+    workers: number of worker processes, by default os.cpu_count(). With 0
+    the documents are processed in the calling process
+    chunksize: number of documents sent to a worker at a time
+    max_in_flight: maximum number of chunks sent to the workers and not yet
+    generated, by default 2*workers. Bounds the number of documents (and
+    results) held in memory
+    mp_context: multiprocessing context of the pool (see
+    concurrent.futures.ProcessPoolExecutor)
+    extract: function of a ConTextDocument applied in the workers; its
+    result is generated instead of the document. Must be picklable (a
+    module level function) with the spawn and forkserver contexts
+    options: passed to pipeline.markup_document (splitter, prune_inactive,
+    drop_category, markup_class, ...). A tagIDs strategy cannot be passed to
+    worker processes: each worker would return the same ids
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1, not {0}".format(chunksize))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 2*max(workers, 1)
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1, not {0}".format(max_in_flight))
+    if workers != 0 and options.get("tagIDs") is not None:
+        raise ValueError("tagIDs cannot be shared by worker processes; "
+                         "use workers=0 or the default strategy")
+    modifiers = _compile(modifiers)
+    targets = _compile(targets)
+
+    if workers == 0:
+        for chunk in _chunks(documents, chunksize):
+            for document in _markup_documents(chunk, modifiers, targets, extract, options):
+                yield document
+        return
+
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                  mp_context=mp_context,
+                                                  initializer=_init_worker,
+                                                  initargs=(modifiers, targets, extract, options))
+    pending = collections.deque()
+    try:
+        for chunk in _chunks(documents, chunksize):
+            if len(pending) >= max_in_flight:
+                for document in pending.popleft().result():
+                    yield document
+            pending.append(pool.submit(_worker_markup_documents, chunk))
+        while pending:
+            for document in pending.popleft().result():
+                yield document
+    finally:
+        # the generator may be closed before all the chunks were processed
+        for future in pending:
+            future.cancel()
+        pool.shutdown()
+
+
+def process(documents, modifiers, targets, workers=None, chunksize=8,
+            max_in_flight=None, mp_context=None, extract=None, **options):
+    """
+    return the list of the ConTextDocuments of documents in input order. See
+    iprocess for the arguments
+    """
+    return list(iprocess(documents, modifiers, targets, workers=workers,
+                         chunksize=chunksize, max_in_flight=max_in_flight,
+                         mp_context=mp_context, extract=extract, **options))
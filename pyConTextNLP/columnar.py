@@ -0,0 +1,174 @@
+#Copyright 2010 Brian E. Chapman
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+"""
+Columnar export of the findings (marked targets and their modifiers) of many
+documents for bulk loading into analytics databases.
+
+    from pyConTextNLP import columnar, stream
+    results = stream.stream(reports, modifiers, targets,
+                            extract=columnar.document_columns)
+    columnar.write(columnar.table(results), "findings.parquet")
+
+The findings are gathered straight into one list per column (see COLUMNS)
+and converted to arrays once. Files are written with pyarrow (Arrow IPC
+".arrow"/".feather" or Parquet ".parquet") or, without pyarrow, with numpy
+(".npz"). The categories of a tag are joined by ","; the modifiers of the
+findings are flattened into modifier_category with modifier_count giving the
+number of modifiers of each finding (Arrow and Parquet files hold a list
+column instead).
+"""
+import itertools
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# one row per finding
+FINDING_COLUMNS = ("sentence", "literal", "phrase", "category",
+                   "span_start", "span_end", "modifier_count")
+# one row per modifier of a finding
+MODIFIER_COLUMNS = ("modifier_category",)
+COLUMNS = ("doc_id",) + FINDING_COLUMNS + MODIFIER_COLUMNS
+
+INTEGER_COLUMNS = frozenset(["sentence", "span_start", "span_end", "modifier_count"])
+
+FORMATS = {".arrow":"arrow", ".feather":"arrow", ".ipc":"arrow",
+           ".parquet":"parquet", ".npz":"npz"}
+
+
+def document_columns(document):
+    """
+    return the findings of document (in sentence and span order, as
+    stream.findings) as a dictionary of FINDING_COLUMNS and MODIFIER_COLUMNS
+    lists. Can be used as the extract function of batch.process and
+    stream.stream
+    """
+    columns = dict((name, []) for name in FINDING_COLUMNS + MODIFIER_COLUMNS)
+    sentence, literal, phrase, category, span_start, span_end, modifier_count = \
+        [columns[name].append for name in FINDING_COLUMNS]
+    modifier_category = columns["modifier_category"].extend
+    for number, markup in enumerate(document.getMarkups()):
+        for target in markup.getMarkedTargets():
+            modifiers = markup.getModifiers(target)
+            start, end = target.getSpan()
+            sentence(number)
+            literal(target.getLiteral())
+            phrase(target.getPhrase())
+            category(",".join(target.getCategory()))
+            span_start(start)
+            span_end(end)
+            modifier_count(len(modifiers))
+            modifier_category(",".join(modifier.getCategory()) for modifier in modifiers)
+    return columns
+
+
+def table(results):
+    """
+    return the columns (see COLUMNS) of the findings of results: an iterable
+    of (id, document) pairs, of (id, document_columns(document)) pairs (e.g.
+    from stream.stream with extract=document_columns) or of documents, whose
+    id is then their position (from 0)
+    """
+    columns = dict((name, []) for name in COLUMNS)
+    for position, result in enumerate(results):
+        if isinstance(result, tuple):
+            doc_id, result = result
+        else:
+            doc_id = position
+        if not isinstance(result, dict):
+            result = document_columns(result)
+        for name in FINDING_COLUMNS + MODIFIER_COLUMNS:
+            columns[name].extend(result[name])
+        columns["doc_id"].extend(itertools.repeat(doc_id, len(result["sentence"])))
+    return columns
+
+
+def write(columns, path, format=None):
+    """
+    write the columns returned by table to path as "arrow" (Arrow IPC file),
+    "parquet" or "npz". The format defaults to the one of the extension of
+    path, else to "arrow" with pyarrow and "npz" without
+    """
+    if format is None:
+        extension = path[path.rfind("."):].lower() if "." in path else ""
+        format = FORMATS.get(extension, "arrow" if pyarrow is not None else "npz")
+    if format == "npz":
+        _write_npz(columns, path)
+    elif format in ("arrow", "parquet"):
+        if pyarrow is None:
+            raise ImportError("writing {0} files requires pyarrow".format(format))
+        _write_arrow(columns, path, format)
+    else:
+        raise ValueError("unknown format {0!r}".format(format))
+    return format
+
+
+def write_findings(results, path, format=None):
+    """write the findings of results (see table) to path (see write)"""
+    return write(table(results), path, format)
+
+
+def to_arrow(columns):
+    """return the columns returned by table as a pyarrow.Table, with
+    modifier_category as a list column (a list for each finding)"""
+    arrays = []
+    for name in COLUMNS[:-1]:
+        if name == "doc_id":
+            arrays.append(pyarrow.array(columns[name]))
+        elif name in INTEGER_COLUMNS:
+            arrays.append(pyarrow.array(columns[name], pyarrow.int64()))
+        else:
+            arrays.append(pyarrow.array(columns[name], pyarrow.string()))
+    offsets = itertools.chain([0], itertools.accumulate(columns["modifier_count"]))
+    arrays.append(pyarrow.ListArray.from_arrays(
+        pyarrow.array(offsets, pyarrow.int64()),
+        pyarrow.array(columns["modifier_category"], pyarrow.string()),
+        type=pyarrow.list_(pyarrow.string())))
+    return pyarrow.Table.from_arrays(arrays, names=list(COLUMNS))
+
+
+def _write_arrow(columns, path, format):
+    arrowTable = to_arrow(columns)
+    if format == "parquet":
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(arrowTable, path)
+    else:
+        import pyarrow.ipc
+        with pyarrow.OSFile(path, "wb") as sink:
+            with pyarrow.ipc.new_file(sink, arrowTable.schema) as writer:
+                writer.write_table(arrowTable)
+
+
+def _write_npz(columns, path):
+    if numpy is None:
+        raise ImportError("writing npz files requires numpy")
+    arrays = {}
+    for name in COLUMNS:
+        if name in INTEGER_COLUMNS:
+            arrays[name] = numpy.asarray(columns[name], dtype=numpy.int64)
+        elif name == "doc_id":
+            arrays[name] = numpy.asarray(columns[name])
+            if arrays[name].dtype.kind not in "iu":
+                arrays[name] = numpy.asarray([str(i) for i in columns[name]], dtype=str)
+        else:
+            arrays[name] = numpy.asarray(columns[name], dtype=str)
+    # numpy.savez appends .npz to other file names
+    with open(path, "wb") as f0:
+        numpy.savez(f0, **arrays)
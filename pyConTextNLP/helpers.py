@@ -20,6 +20,11 @@ through the class methods addExceptionTerms and deleteExceptionTerms. A short li
 common in English texts are included in the attribute defaultExceptions. By default these are
 used when a sentenceSplitter instance is created.
 """
+import re
+
+# the words of a text as split by str.split()
+WORD = re.compile(r"""\S+""", re.UNICODE)
+
 class sentenceSplitter(object):
     """Class for splitting sentences"""
 
@@ -70,31 +75,35 @@ class sentenceSplitter(object):
     def splitSentences(self,txt):
         """
         Splt txt into sentences a list of sentences is returned
+        (the words of each sentence joined by single spaces)
         """
-        txt = txt.split()
-        sentences = []
-        wordLoc = 0
+        return [' '.join(txt[start:end].split()) for start, end in self.sentenceSpans(txt)]
 
-        while wordLoc < len(txt):
-            currentWord = txt[wordLoc]
+    def sentenceSpans(self, txt):
+        """
+        Generate the (start, end) character offsets in txt of the sentences of
+        txt, in a single pass over its words. txt[start:end] runs from the
+        first word to the last word (inclusive) of the sentence.
+        A sentence ends with a word ending with '.', '?' or '!' that is not an
+        exception term; any remaining words make up a final sentence.
+        """
+        start = None
+        for word in WORD.finditer(txt):
+            if start is None:
+                start = word.start()
+            currentWord = word.group()
             if currentWord[-1] in '.?!':
                 if currentWord in  self.exceptionTerms:
-                    wordLoc += 1
+                    continue
                 # per discussion with A.G. dropped this exception, since assuming numbers only use decimal points if there
                 # are actual decimal point digits expressed and thus the period would not be the last character of the word.
                 #elif( self.digits.intersection(currentWord) and
                         #not set('()').intersection(currentWord)): # word doesn't include parentheses. Is this necessary?
-                    #wordLoc += 1
+                    #continue
                 else:
-                    sentences.append(' '.join(txt[:wordLoc+1]))
-                    txt = txt[wordLoc+1:]
-                    wordLoc = 0
-            else:
-                wordLoc += 1
-
+                    yield start, word.end()
+                    start = None
         # if any texts remains (due to failure to identify a final sentence termination,
         # then take all remaining text and put into a sentence
-        if txt:
-            sentences.append(' '.join(txt) )
-
-        return sentences
+        if start is not None:
+            yield start, word.end()
@@ -0,0 +1,21 @@
+"""
+module for writing ConTextDocuments as JSON lines (one document per line)
+and reading them back
+"""
+from ..pyConText import ConTextDocument
+
+
+def dump_documents(documents, fp):
+    """write the documents to the text file fp, one JSON object (see
+    ConTextDocument.toDict) per line"""
+    for document in documents:
+        fp.write(document.toJSON())
+        fp.write("\n")
+
+
+def load_documents(fp, **options):
+    """generate the documents of a file written by dump_documents. options
+    are passed to ConTextDocument.fromDict (e.g. markupClass)"""
+    for line in fp:
+        if line.strip():
+            yield ConTextDocument.fromJSON(line, **options)
@@ -1,12 +1,17 @@
 """
 module for creating XML files
 """
-import re
-
-rlt = re.compile(r"""<""", re.UNICODE)
-ramp = re.compile(r"""&""", re.UNICODE)
 
 
 def xmlScrub(tmp):
-    return rlt.sub(r"&lt;",ramp.sub(r"&amp;",u"{0}".format(tmp)))
+    # escape "&" first so that the "&" of "&lt;" is kept
+    return u"{0}".format(tmp).replace(u"&", u"&amp;").replace(u"<", u"&lt;")
+
 
+def skeletonParts(skeleton, *fields):
+    """split an XML skeleton (a format string) at the given fields, e.g.
+    skeletonParts("<a>{0}</a>", "{0}") returns ["<a>", "</a>"]"""
+    parts = [skeleton]
+    for field in fields:
+        parts[-1:] = parts[-1].split(field)
+    return parts
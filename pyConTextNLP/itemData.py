@@ -15,8 +15,55 @@
 """
 A module defining the contextItem class.
 """
+import csv
+import enum
+import hashlib
+import io
+import operator
+import os
+import pickle
+import tempfile
 import yaml
 import urllib.request, urllib.error, urllib.parse
+from .matcher import ItemMatcher
+
+# characters with a special meaning in a regular expression
+REGEX_META_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+# the C (libyaml) loader when PyYAML is built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# keys of each YAML document of a lexicon (besides e.g. Comments)
+REQUIRED_KEYS = ("Lex", "Type", "Regex", "Direction")
+
+# version of the files of the lexicon cache (see get_items); a new version
+# ignores the files written by the previous ones
+KB_CACHE_VERSION = 1
+
+
+class Rule(enum.Enum):
+    """the rule (direction) of a contextItem parsed once from its rule string"""
+    NONE = 0            # no rule: the item does not modify other items
+    FORWARD = 1
+    BACKWARD = 2
+    BIDIRECTIONAL = 3
+    TERMINATE = 4
+    OTHER = 5           # a rule string naming no known direction
+
+
+def parse_rule(rule):
+    """parse the (lower case) rule string of a contextItem into a Rule"""
+    if not rule:
+        return Rule.NONE
+    if rule == 'terminate':
+        return Rule.TERMINATE
+    if 'forward' in rule:
+        return Rule.FORWARD
+    if 'backward' in rule:
+        return Rule.BACKWARD
+    if 'bidirectional' in rule:
+        return Rule.BIDIRECTIONAL
+    return Rule.OTHER
 
 
 def _get_fileobj(_file):
@@ -24,38 +71,205 @@ def _get_fileobj(_file):
         _file = "file://"+_file
     return urllib.request.urlopen(_file, data=None)
 
-def get_items(_file):
+def _iter_parsed_items(f0, source):
+    """generate the contextItems of the YAML documents of the file object
+    (or string) f0 as they are parsed, checking that each document has the
+    REQUIRED_KEYS. source names f0 in error messages"""
+    for number, d in enumerate(yaml.load_all(f0, Loader=YAML_LOADER)):
+        if d is None: # empty document, e.g. after a final ---
+            continue
+        if not isinstance(d, dict):
+            raise ValueError("document {0:d} of {1} is not a mapping".format(number, source))
+        missing = [key for key in REQUIRED_KEYS if key not in d]
+        if missing:
+            raise ValueError("document {0:d} of {1} lacks {2}".format(
+                number, source, ", ".join(missing)))
+        yield contextItem((d["Lex"],
+                           d["Type"],
+                           r"%s"%d["Regex"],
+                           d["Direction"]))
+
+def iter_items(_file):
+    """
+    generate the contextItems of the YAML lexicon _file (a path or URL) one
+    document at a time, so that large lexicons are not held in memory as
+    YAML documents. Raises ValueError for a document without one of the
+    REQUIRED_KEYS
+    """
     f0 = _get_fileobj(_file)
-    context_items =  [contextItem((d["Lex"],
-                                   d["Type"],
-                                   r"%s"%d["Regex"],
-                                   d["Direction"])) for d in yaml.load_all(f0)]
-    f0.close()
-    return context_items
+    try:
+        for item in _iter_parsed_items(f0, _file):
+            yield item
+    finally:
+        f0.close()
+
+def _load_cached(_file, cache_dir, kind, parse):
+    """
+    return parse(content of _file), pickled in cache_dir under the kind and
+    the SHA-256 hash of the content (so a changed file is parsed again)
+    """
+    f0 = _get_fileobj(_file)
+    try:
+        if cache_dir is None:
+            return parse(f0, _file)
+        content = f0.read()
+    finally:
+        f0.close()
+    path = os.path.join(cache_dir, "{0}-{1}-v{2}.pickle".format(
+        kind, hashlib.sha256(content).hexdigest(), KB_CACHE_VERSION))
+    try:
+        with open(path, "rb") as f1:
+            return pickle.load(f1)
+    except Exception: # not cached yet (or an unreadable cache file)
+        pass
+    result = parse(content, _file)
+    os.makedirs(cache_dir, exist_ok=True)
+    # write to a temporary file renamed when complete so that concurrent
+    # processes never read a partial cache file
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f1:
+            pickle.dump(result, f1, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return result
+
+def get_items(_file, cache_dir=None):
+    """
+    return the list of contextItems of the YAML lexicon _file (a path or URL).
+    cache_dir: optional directory of a cache of parsed lexicons. The items
+    are pickled there keyed by the hash of the content of _file and loaded
+    from the cache until the content changes
+    """
+    return _load_cached(_file, cache_dir, "items",
+                        lambda f0, source: list(_iter_parsed_items(f0, source)))
+
+def get_lexicon(_file, cache_dir=None, ignoreCase=True):
+    """
+    return the CompiledLexicon of the YAML lexicon _file (see get_items).
+    With cache_dir the compiled lexicon is cached
+    """
+    return _load_cached(_file, cache_dir, "lexicon-{0:d}".format(bool(ignoreCase)),
+                        lambda f0, source: CompiledLexicon(_iter_parsed_items(f0, source),
+                                                           ignoreCase=ignoreCase))
+
+def _iter_rows(f0, encoding, delimiter):
+    """generate the rows of the CSV file object (or bytes) f0"""
+    if isinstance(f0, bytes):
+        f0 = io.BytesIO(f0)
+    # urlopen wraps local files in an object delegating every attribute
+    # lookup (e.g. the closed check made for each line) to the file
+    f0 = getattr(f0, "file", f0)
+    return csv.reader(io.TextIOWrapper(f0, encoding=encoding, newline=""),
+                      delimiter=delimiter)
+
+def _iter_csv_items(f0, source, encoding, delimiter):
+    """generate the contextItems of the rows of the CSV file object (or
+    bytes) f0 whose first row names the columns, which must include the
+    REQUIRED_KEYS. source names f0 in error messages"""
+    rows = _iter_rows(f0, encoding, delimiter)
+    header = next(rows, [])
+    missing = [key for key in REQUIRED_KEYS if key not in header]
+    if missing:
+        raise ValueError("the header of {0} lacks {1}".format(source, ", ".join(missing)))
+    columns = [header.index(key) for key in REQUIRED_KEYS]
+    width = max(columns) + 1
+    fields = operator.itemgetter(*columns)
+    for row in rows:
+        if len(row) < width:
+            if not any(row):
+                continue
+            row = row + [""]*(width-len(row)) # trailing empty cells left out
+        yield contextItem(fields(row))
+
+def _csv_delimiter(_file, delimiter):
+    """the delimiter of the lexicon _file: tab unless it is a .csv file"""
+    if delimiter is None:
+        return "," if urllib.parse.urlparse(_file).path.lower().endswith(".csv") else "\t"
+    return delimiter
+
+def iter_csv_items(_file, delimiter=None, encoding="utf-8-sig"):
+    """
+    generate the contextItems of the CSV or TSV lexicon _file (a path or URL)
+    row by row. The first row names the columns: Lex, Type, Regex and
+    Direction (as the keys of the YAML lexicons; other columns are ignored).
+    delimiter defaults to "," for .csv files and to a tab otherwise
+    """
+    f0 = _get_fileobj(_file)
+    try:
+        for item in _iter_csv_items(f0, _file, encoding, _csv_delimiter(_file, delimiter)):
+            yield item
+    finally:
+        f0.close()
+
+def get_csv_items(_file, delimiter=None, encoding="utf-8-sig", cache_dir=None):
+    """
+    return the list of contextItems of the CSV or TSV lexicon _file (see
+    iter_csv_items), the same items as get_items returns for the YAML version
+    of the lexicon. cache_dir: see get_items
+    """
+    delimiter = _csv_delimiter(_file, delimiter)
+    return _load_cached(_file, cache_dir, "csv-items-{0}".format(ord(delimiter)),
+                        lambda f0, source: list(_iter_csv_items(f0, source, encoding, delimiter)))
+
+def instantiateFromCSVtoitemData(csvFile, encoding='utf-8', headerRows=1,
+                                 literalColumn=0, categoryColumn=1, regexColumn=2, ruleColumn=3):
+    """
+    return the list of contextItems of the tab delimited lexicon csvFile (a
+    path or URL), as earlier versions of pyConTextNLP: the first headerRows
+    rows are skipped, the columns are given by position and rows without a
+    literal or whose literal starts with # are skipped
+    """
+    f0 = _get_fileobj(csvFile)
+    try:
+        rows = _iter_rows(f0, encoding, "\t")
+        for row in range(headerRows):
+            next(rows, None)
+        columns = (literalColumn, categoryColumn, regexColumn, ruleColumn)
+        width = max(columns) + 1
+        fields = operator.itemgetter(*columns)
+        items = []
+        for row in rows:
+            if len(row) < width:
+                row = row + [""]*(width-len(row))
+            if row[literalColumn] and not row[literalColumn].startswith('#'):
+                items.append(contextItem(fields(row)))
+        return items
+    finally:
+        f0.close()
 
 
 class contextItem(object):
+    __slots__ = ("__literal", "__category", "__re", "__rule", "__parsedRule",
+                 "__isLiteral")
 
 
     def __init__(self, args):
         self.__literal = args[0]
         cs = args[1].split(",")
-        self.__category = []
-        for c in cs:
-            self.__category.append(c.lower().strip())
+        self.__category = tuple(c.lower().strip() for c in cs)
         self.__re = r"%s"%args[2] # I need to figure out how to read this raw string in properly
         self.__rule = args[3].lower()
+        self.__parsedRule = parse_rule(self.__rule)
 
         # generate regex from literal if no regex provided
+        self.__isLiteral = False
         if not self.__re:
             self.__re = r"\b{}\b".format(self.__literal)
+            self.__isLiteral = bool(self.__literal) and \
+                not REGEX_META_CHARS.intersection(self.__literal)
 
     def getLiteral(self):
         """return the literal associated with this item"""
         return self.__literal
     def getCategory(self):
         """return the list of categories associated with this item"""
-        return self.__category[:]
+        return list(self.__category)
+    def getCategoryTuple(self):
+        """return the (shared, immutable) tuple of categories associated with this item"""
+        return self.__category
     def categoryString(self):
         """return the categories as a string delimited by '_'"""
         return '_'.join(self.__category)
@@ -73,12 +287,52 @@ class contextItem(object):
 
     def getRE(self):
         return self.__re
+    def isLiteral(self):
+        """return True if no regular expression was provided for self and the
+        literal contains no regular expression syntax, i.e. self matches its
+        literal (delimited by word boundaries) verbatim"""
+        return self.__isLiteral
     def getRule(self):
         return self.__rule
+    def getParsedRule(self):
+        """return the rule of self as a Rule"""
+        return self.__parsedRule
     def __str__(self):
         txt = """literal<<{0}>>; category<<{1}>>; re<<{2}>>; rule<<{3}>>""".format(
-            self.__literal,self.__category,self.__re, self.__rule)
+            self.__literal,list(self.__category),self.__re, self.__rule)
         return txt
     def __repr__(self):
         return self.__str__()
 
+
+class CompiledLexicon(object):
+    """
+    A list of contextItems compiled once into an ItemMatcher. The regular
+    expressions (and the literal trie) are built when the lexicon is created,
+    so a CompiledLexicon can be built once, shared by any number of
+    ConTextMarkup objects and pickled to worker processes ready to run.
+
+    A CompiledLexicon can be used wherever a list of contextItems is expected.
+    """
+    def __init__(self, items, ignoreCase=True, cache=None):
+        """
+        items: list of contextItems
+        ignoreCase: if True (default) regular expressions are compiled with
+        IGNORECASE
+        cache: optional RegexCache used to compile the regular expressions
+        """
+        self.__items = list(items)
+        self.__matcher = ItemMatcher(self.__items, ignoreCase=ignoreCase, cache=cache)
+
+    def getItems(self):
+        """return the list of contextItems in the lexicon"""
+        return self.__items[:]
+    def getMatcher(self):
+        """return the ItemMatcher compiled from the lexicon"""
+        return self.__matcher
+    def __len__(self):
+        return len(self.__items)
+    def __iter__(self):
+        return iter(self.__items)
+    def __getitem__(self, index):
+        return self.__items[index]
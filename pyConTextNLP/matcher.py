@@ -0,0 +1,577 @@
+"""
+Module defining the ItemMatcher class.
+
+ConTextMarkup.markItem scans the text once for every contextItem. An
+ItemMatcher is built once from a list of contextItems and finds the matches of
+every item in a single pass over the text: each position of the text is
+dispatched, by its character, to the (usually few) items whose regular
+expression can begin with that character. Items whose first character cannot
+be determined (e.g. regular expressions starting with '.' or '\\w') are scanned
+with finditer as before.
+
+Regular expressions that require a run of at least ANCHOR_SIZE literal
+characters (e.g. "embol" in r"pulmonary\\s(embol[a-z]+)") are not dispatched at
+all: the matcher indexes them by a character n-gram of their longest required
+literal (their anchor) and runs an item only on the texts that contain its
+anchor. Most texts contain the anchors of few items, so most regular
+expressions of a large lexicon are never run on a given text.
+
+Items that are pure literals (see contextItem.isLiteral) are not matched with
+regular expressions at all but with a case-folded Aho-Corasick automaton
+(LiteralTrie), so the time spent on them grows with the length of the text and
+not with the number of literals.
+
+The matches reported for each item are identical to those reported by
+regex.finditer for that item.
+
+The module also defines RegexCache, a bounded cache of compiled regular
+expressions used by ConTextMarkup.markItem.
+"""
+import re
+import string
+import threading
+from collections import OrderedDict
+
+try:
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError: # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+_LITERAL = sre_constants.LITERAL
+_IN = sre_constants.IN
+_RANGE = sre_constants.RANGE
+_AT = sre_constants.AT
+_AT_BOUNDARY = sre_constants.AT_BOUNDARY
+_BRANCH = sre_constants.BRANCH
+_SUBPATTERN = sre_constants.SUBPATTERN
+_ZERO_WIDTH = (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT)
+_REPEATS = tuple(getattr(sre_constants, op) for op in
+                 ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT")
+                 if hasattr(sre_constants, op))
+_GROUPS = tuple(getattr(sre_constants, op) for op in ("ATOMIC_GROUP",)
+                if hasattr(sre_constants, op))
+
+# largest character range that is expanded into individual first characters
+MAX_RANGE_EXPANSION = 256
+
+# minimum length of the required literal run an item is indexed by
+ANCHOR_SIZE = 3
+
+# default number of compiled regular expressions held by a RegexCache
+DEFAULT_CACHE_SIZE = 4096
+
+
+def get_item_regex(item):
+    """
+    return the regular expression used to mark item
+    """
+    if not item.getRE():
+        return r"\b{}\b".format(item.getLiteral())
+    return item.getRE()
+
+
+class RegexCache(object):
+    """
+    least recently used cache of compiled regular expressions keyed on the
+    regular expression and its flags. A RegexCache can be shared process wide
+    (ConTextMarkup.COMPILED_REGEXPRS) or scoped to a lexicon by passing
+    it to ConTextMarkup.markItems or ItemMatcher.
+    """
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        """
+        maxsize: maximum number of compiled regular expressions to hold. If
+        None the cache is unbounded.
+        """
+        self.__maxsize = maxsize
+        self.__regexes = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+
+    def compile(self, reg_exp, flags=0):
+        """
+        return reg_exp compiled with flags, compiling it only if it is not
+        already in the cache
+        """
+        key = (reg_exp, flags)
+        with self.__lock:
+            regex = self.__regexes.get(key)
+            if regex is not None:
+                self.__regexes.move_to_end(key)
+                self.__hits += 1
+                return regex
+            self.__misses += 1
+        regex = re.compile(reg_exp, flags)
+        with self.__lock:
+            self.__regexes[key] = regex
+            if self.__maxsize is not None and len(self.__regexes) > self.__maxsize:
+                self.__regexes.popitem(last=False)
+        return regex
+
+
+    def __contains__(self, key):
+        """key is a (regular expression, flags) tuple"""
+        return key in self.__regexes
+
+
+    def __len__(self):
+        return len(self.__regexes)
+
+
+    def clear(self):
+        """empty the cache and reset the hit and miss counts"""
+        with self.__lock:
+            self.__regexes.clear()
+            self.__hits = 0
+            self.__misses = 0
+
+
+    def getMaxSize(self):
+        return self.__maxsize
+
+
+    def getHits(self):
+        """return the number of compile calls answered from the cache"""
+        return self.__hits
+
+
+    def getMisses(self):
+        """return the number of compile calls that compiled a regular expression"""
+        return self.__misses
+
+
+    def __getstate__(self):
+        return {"maxsize":self.__maxsize}
+
+
+    def __setstate__(self, state):
+        self.__init__(state["maxsize"])
+
+
+def _class_chars(members):
+    """return the characters matched by the character class members or None
+    if the class is negated or contains categories"""
+    chars = set()
+    for op, av in members:
+        if op is _LITERAL:
+            chars.add(chr(av))
+        elif op is _RANGE and av[1] - av[0] < MAX_RANGE_EXPANSION:
+            chars.update(chr(c) for c in range(av[0], av[1]+1))
+        else:
+            return None
+    return chars
+
+
+def _group_body(op, av):
+    """return the parsed sequence of a group (av of op SUBPATTERN or ATOMIC_GROUP)"""
+    if op is _SUBPATTERN:
+        return av[-1]
+    return av
+
+
+def _first_chars(seq):
+    """
+    return a tuple (chars, nullable) where chars is the set of characters that
+    can begin a match of the parsed sequence seq (None if unbounded) and
+    nullable is True if the sequence can be matched without consuming a character
+    """
+    chars = set()
+    for op, av in seq:
+        if op in _ZERO_WIDTH:
+            continue
+        if op is _LITERAL:
+            chars.add(chr(av))
+            return chars, False
+        if op is _IN:
+            members = _class_chars(av)
+            if members is None:
+                return None, False
+            return chars | members, False
+        if op is _BRANCH:
+            nullable = False
+            for alternative in av[1]:
+                members, _nullable = _first_chars(alternative)
+                if members is None:
+                    return None, False
+                chars |= members
+                nullable = nullable or _nullable
+        elif op is _SUBPATTERN or op in _GROUPS:
+            members, nullable = _first_chars(_group_body(op, av))
+            if members is None:
+                return None, False
+            chars |= members
+        elif op in _REPEATS:
+            members, nullable = _first_chars(av[2])
+            if members is None:
+                return None, False
+            chars |= members
+            nullable = nullable or av[0] == 0
+        else:
+            return None, False
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def _literal_runs(seq, runs, run=""):
+    """
+    append to runs the runs of (case-folded ASCII) literal characters that
+    every match of the parsed sequence seq contains. run is the run seq
+    continues; the run seq ends with is returned instead of appended
+    """
+    for op, av in seq:
+        if op is _LITERAL and av < 128:
+            run += chr(av).lower()
+            continue
+        if op in _ZERO_WIDTH:
+            continue
+        if op is _SUBPATTERN or op in _GROUPS:
+            run = _literal_runs(_group_body(op, av), runs, run)
+            continue
+        if op in _REPEATS and av[0] > 0:
+            run = _literal_runs(av[2], runs, run)
+            if av[1] == 1:
+                continue
+        runs.append(run)
+        run = ""
+    return run
+
+
+def _anchor(parsed):
+    """
+    return the longest literal run every match of the parsed regular expression
+    contains or None if it is shorter than ANCHOR_SIZE
+    """
+    runs = []
+    runs.append(_literal_runs(parsed.data, runs))
+    anchor = max(runs, key=len)
+    if len(anchor) < ANCHOR_SIZE:
+        return None
+    return anchor
+
+
+def _ngrams(txt):
+    """return the set of the ANCHOR_SIZE long substrings of txt"""
+    return set(txt[i:i+ANCHOR_SIZE] for i in range(len(txt)-ANCHOR_SIZE+1))
+
+
+_ASCII_FOLDS = [(char, re.compile(re.escape(char), re.IGNORECASE|re.UNICODE))
+                for char in string.ascii_lowercase]
+
+
+_FOLDS = {}
+
+
+def _fold(char):
+    """return the ASCII character char matches with re.IGNORECASE (e.g. 'k' for
+    the Kelvin sign), else char (lowered if ASCII)"""
+    try:
+        return _FOLDS[char]
+    except KeyError:
+        pass
+    folded = char.lower()
+    if not char.isascii():
+        folded = char
+        for ascii_char, regex in _ASCII_FOLDS:
+            if regex.fullmatch(char):
+                folded = ascii_char
+                break
+    _FOLDS[char] = folded
+    return folded
+
+
+def _fold_text(txt):
+    """return txt with every character folded (see _fold)"""
+    if txt.isascii():
+        return txt.lower()
+    return "".join([_fold(char) for char in txt])
+
+
+def _is_word(char):
+    """mirrors the unicode definition of a word character used by \\b"""
+    return char.isalnum() or char == '_'
+
+
+class literalMatch(object):
+    """
+    match of a literal in a text. Provides the subset of the regular
+    expression match object interface used by ConTextMarkup.
+    """
+    __slots__ = ("string", "pos", "endpos")
+
+    def __init__(self, txt, start, end):
+        self.string = txt
+        self.pos = start
+        self.endpos = end
+
+    def span(self):
+        return self.pos, self.endpos
+
+    def start(self):
+        return self.pos
+
+    def end(self):
+        return self.endpos
+
+    def group(self):
+        return self.string[self.pos:self.endpos]
+
+    def groupdict(self):
+        return {}
+
+
+class LiteralTrie(object):
+    """
+    Aho-Corasick automaton that finds word-boundary delimited occurrences of a
+    list of ASCII literals in a single pass over a text. With ignoreCase each
+    character of the text is folded to the ASCII character it matches with
+    re.IGNORECASE (e.g. the Kelvin sign folds to 'k'), so the matches are the
+    same as those of re.finditer(r"\\bliteral\\b", txt, re.IGNORECASE).
+    """
+    def __init__(self, literals, ignoreCase=True):
+        self.__ignoreCase = ignoreCase
+        self.__lengths = [len(literal) for literal in literals]
+        self.__goto = [{}]
+        self.__output = [[]]
+        for index, literal in enumerate(literals):
+            if ignoreCase:
+                literal = literal.lower()
+            state = 0
+            for char in literal:
+                next_state = self.__goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.__goto)
+                    self.__goto[state][char] = next_state
+                    self.__goto.append({})
+                    self.__output.append([])
+                state = next_state
+            self.__output[state].append(index)
+        self.__fail = [0]*len(self.__goto)
+        queue = list(self.__goto[0].values())
+        for state in queue:
+            for char, next_state in self.__goto[state].items():
+                queue.append(next_state)
+                fail = self.__fail[state]
+                while fail and char not in self.__goto[fail]:
+                    fail = self.__fail[fail]
+                fail = self.__goto[fail].get(char, 0)
+                self.__fail[next_state] = fail
+                self.__output[next_state] = self.__output[next_state] + self.__output[fail]
+
+
+    def __len__(self):
+        return len(self.__lengths)
+
+
+    def fold(self, char):
+        """return the character char is matched to in the automaton"""
+        if not self.__ignoreCase:
+            return char
+        return _fold(char)
+
+
+    def finditer(self, txt):
+        """
+        generate (index, start, end) for the non-overlapping occurrences of
+        each literal in txt. Occurrences are generated in order of their end.
+        """
+        goto = self.__goto
+        fail = self.__fail
+        output = self.__output
+        lengths = self.__lengths
+        words = [_is_word(char) for char in txt]
+        words.append(False)
+        next_start = {}
+        state = 0
+        for pos, char in enumerate(txt):
+            char = self.fold(char)
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            end = pos+1
+            if words[pos] == words[end]:
+                continue
+            for index in output[state]:
+                start = end-lengths[index]
+                if start > 0 and words[start-1] == words[start]:
+                    continue
+                if start == 0 and not words[0]:
+                    continue
+                if next_start.get(index, 0) > start:
+                    continue
+                next_start[index] = end
+                yield index, start, end
+
+
+class ItemMatcher(object):
+    """
+    Finds the matches of a list of contextItems in a single pass over a text.
+    The matcher is built once and can be shared by any number of ConTextMarkup
+    objects (see ConTextMarkup.markItems).
+    """
+    def __init__(self, items, ignoreCase=True, cache=None):
+        """
+        items: list of contextItems
+        ignoreCase: if True (default) regular expressions are compiled with
+        IGNORECASE
+        cache: optional RegexCache used to compile the regular expressions
+        """
+        self.__items = list(items)
+        if ignoreCase:
+            self.__flags = re.IGNORECASE|re.UNICODE
+        else:
+            self.__flags = re.UNICODE
+        self.__regexes = []
+        self.__boundary = []
+        self.__scanned = []
+        self.__literals = []
+        self.__anchors = []
+        first = {}
+        # anchor n-gram -> [(index, anchor), ...]
+        anchored = {}
+        for index, item in enumerate(self.__items):
+            if item.isLiteral() and item.getLiteral().isascii():
+                self.__literals.append(index)
+                self.__regexes.append(None)
+                self.__boundary.append(False)
+                self.__anchors.append(None)
+                continue
+            reg_exp = get_item_regex(item)
+            if cache is None:
+                self.__regexes.append(re.compile(reg_exp, self.__flags))
+            else:
+                self.__regexes.append(cache.compile(reg_exp, self.__flags))
+            chars, boundary, anchor = self.__parse(reg_exp)
+            self.__boundary.append(boundary)
+            self.__anchors.append(anchor)
+            if anchor is not None:
+                # index the item by the n-gram of its anchor shared by the
+                # fewest items
+                key = min(sorted(_ngrams(anchor)), key=lambda ngram: len(anchored.get(ngram, ())))
+                anchored.setdefault(key, []).append((index, anchor))
+            elif chars is None:
+                self.__scanned.append(index)
+            else:
+                for char in chars:
+                    first.setdefault(char, []).append(index)
+        self.__first = first
+        self.__anchored = anchored
+        self.__keys = dict((char, re.compile(re.escape(char), re.IGNORECASE|re.UNICODE))
+                           for char in first)
+        self.__candidates = {}
+        self.__trie = LiteralTrie([self.__items[index].getLiteral()
+                                   for index in self.__literals], ignoreCase)
+
+
+    def __parse(self, reg_exp):
+        """
+        return the set of possible first characters of reg_exp (None if these
+        cannot be determined), whether reg_exp must begin on a word boundary and
+        the anchor of reg_exp (see _anchor)
+        """
+        parsed = sre_parse.parse(reg_exp, self.__flags)
+        if parsed.getwidth()[0] == 0:
+            return None, False, None
+        anchor = _anchor(parsed)
+        chars, nullable = _first_chars(parsed.data)
+        if nullable:
+            return None, False, anchor
+        boundary = bool(parsed.data) and parsed.data[0] == (_AT, _AT_BOUNDARY) and \
+                   not parsed.state.flags & (re.ASCII|re.LOCALE)
+        return chars, boundary, anchor
+
+
+    def __len__(self):
+        return len(self.__items)
+
+
+    def getItems(self):
+        """return the list of contextItems the matcher was built from"""
+        return self.__items[:]
+
+
+    def getAnchors(self):
+        """
+        return, for each item, the literal its matches must contain (lowered)
+        or None if the item is matched without a prefilter
+        """
+        return self.__anchors[:]
+
+
+    def getAnchoredItems(self, txt):
+        """
+        return the sorted indices of the items with an anchor that occurs in
+        txt: the only items with an anchor that may match txt
+        """
+        anchored = self.__anchored
+        folded = _fold_text(txt)
+        indices = [index for ngram in _ngrams(folded) if ngram in anchored
+                   for index, anchor in anchored[ngram] if anchor in folded]
+        indices.sort()
+        return indices
+
+
+    def getCandidates(self, char):
+        """
+        return a tuple of the sorted indices of the items that may begin a match
+        with char: those that must begin on a word boundary and the others
+        """
+        try:
+            return self.__candidates[char]
+        except KeyError:
+            pass
+        candidates = set(self.__first.get(char, []))
+        for key, key_regex in self.__keys.items():
+            if key != char and key_regex.fullmatch(char):
+                candidates.update(self.__first[key])
+        candidates = sorted(candidates)
+        candidates = ([index for index in candidates if self.__boundary[index]],
+                      [index for index in candidates if not self.__boundary[index]])
+        self.__candidates[char] = candidates
+        return candidates
+
+
+    def finditems(self, txt):
+        """
+        return a list of (item, matches) tuples for the items that match txt, in
+        the order of the items the matcher was built from. matches is the list
+        of match objects regex.finditer would have returned for item.
+        """
+        regexes = self.__regexes
+        found = {}
+        next_start = {}
+        previous_word = False
+        # items with an anchor are not dispatched
+        for pos, char in enumerate(txt if self.__first else ""):
+            word = _is_word(char)
+            bounded, unbounded = self.getCandidates(char)
+            if word != previous_word:
+                candidates = bounded + unbounded if unbounded else bounded
+            else:
+                candidates = unbounded
+            previous_word = word
+            for index in candidates:
+                if next_start.get(index, 0) > pos:
+                    continue
+                match = regexes[index].match(txt, pos)
+                if match:
+                    found.setdefault(index, []).append(match)
+                    next_start[index] = match.end()
+        for index in self.__scanned:
+            matches = list(regexes[index].finditer(txt))
+            if matches:
+                found[index] = matches
+        if self.__anchored:
+            for index in self.getAnchoredItems(txt):
+                matches = list(regexes[index].finditer(txt))
+                if matches:
+                    found[index] = matches
+        if self.__literals:
+            for index, start, end in self.__trie.finditer(txt):
+                found.setdefault(self.__literals[index], []).append(literalMatch(txt, start, end))
+        return [(self.__items[index], found[index]) for index in sorted(found)]
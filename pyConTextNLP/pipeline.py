@@ -0,0 +1,91 @@
+#Copyright 2010 Brian E. Chapman
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+"""
+Entry points running the complete ConText pipeline.
+
+markup_sentence replaces the function of the same name copied in the notebooks
+and scripts:
+
+    markup = ConTextMarkup()
+    markup.setRawText(s)
+    markup.cleanText()
+    markup.markItems(modifiers, mode="modifier")
+    markup.markItems(targets, mode="target")
+    markup.pruneMarks()
+    markup.dropMarks('Exclusion')
+    markup.applyModifiers()
+    markup.pruneSelfModifyingRelationships()
+    if prune_inactive:
+        markup.dropInactiveModifiers()
+
+markup_document splits a document into sentences and collects the sentence
+markups into a ConTextDocument.
+"""
+from .ConTextMarkup import ConTextMarkup
+from .pyConText import ConTextDocument
+from .helpers import sentenceSplitter
+
+
+def markup_sentence(s, modifiers, targets, prune_inactive=True,
+                    drop_category="exclusion", strip_non_alphanumeric=False,
+                    strip_numbers=False, markup_class=ConTextMarkup,
+                    tagIDs=None, cache=None):
+    """
+    return the markup of the sentence s by modifiers and targets (lists of
+    contextItems, ItemMatchers or CompiledLexicons).
+
+    prune_inactive: drop the modifiers not modifying any target
+    drop_category: category of the marks to drop (None to keep all marks)
+    strip_non_alphanumeric, strip_numbers: passed to cleanText
+    markup_class: ConTextMarkup or ConTextMarkupLite
+    tagIDs: tag id strategy of the markup (e.g. a counterTagIDs shared by
+    the markups of a document)
+    cache: RegexCache compiling the regular expressions of lists of items
+
+    Marks that are pruned or dropped are never added to the markup (see
+    ConTextMarkupMixin.runPipeline).
+    """
+    markup = markup_class(tagIDs=tagIDs)
+    markup.setRawText(s)
+    markup.cleanText(stripNonAlphaNumeric=strip_non_alphanumeric,
+                     stripNumod_byers=strip_numbers)
+    markup.runPipeline(modifiers, targets, dropCategory=drop_category,
+                       pruneInactive=prune_inactive, cache=cache)
+    return markup
+
+
+def markup_document(text, modifiers, targets, splitter=None, tagIDs=None, **options):
+    """
+    return the ConTextDocument of text: text is split into sentences with
+    splitter (a helpers.sentenceSplitter, by default a new one with the default
+    exception terms) and each sentence is marked up by
+    markup_sentence(sentence, modifiers, targets, **options).
+
+    The markups of the document use the tag id strategy tagIDs, by default the
+    process wide strategy (see tagObject.set_tag_id_strategy), so that tags of
+    different documents never compare equal. Pass a new counterTagIDs for small
+    per-document ids, which are unique within, not across, documents.
+
+    The document spans of the tags (see tagObject.getDocumentSpan) are spans
+    of text.
+    """
+    if splitter is None:
+        splitter = sentenceSplitter()
+    document = ConTextDocument()
+    for start, end in splitter.sentenceSpans(text):
+        source = text[start:end]
+        document.addMarkup(markup_sentence(' '.join(source.split()), modifiers, targets,
+                                           tagIDs=tagIDs, **options),
+                           offset=start, source=source)
+    return document
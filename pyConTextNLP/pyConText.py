@@ -21,9 +21,11 @@ sub-texts of interest
 3) pyConText: a class that implements the context algorithm
 
 """
+import json
+import operator
 import re
 from .ConTextMarkup import ConTextMarkup
-from .io.xml import xmlScrub
+from .io.xml import xmlScrub, skeletonParts
 import networkx as nx
 
 
@@ -34,6 +36,8 @@ ConTextDocumentXMLSkel=\
 </ConTextDocument>
 """
 
+ConTextDocumentXMLHead, ConTextDocumentXMLTail = skeletonParts(ConTextDocumentXMLSkel, "{0}")
+
 
 class ConTextDocument(object):
     """
@@ -56,13 +60,47 @@ class ConTextDocument(object):
         self.__currentParent = "document"
         self.__root = "document"
         self.__documentGraph = None
+        # length of the document text (see getDocumentText) so far
+        self.__documentLength = 0
+        # indexes of the markup and section edges of __document in the order
+        # they were added: (number, parent, child, edge data). An entry is
+        # stale if the edge was added again (its data then has a new number)
+        self.__markups = []
+        self.__sectionMarkups = {}
+        self.__sections = []
+        self.__childSections = {}
+        # the markup and section entries in the order they were added
+        self.__entries = []
 
     def insertSection(self,sectionLabel,setToParent=False):
         self.__document.add_edge(self.__currentParent,sectionLabel,category="section",__sectionNumber=self.__currentSectionNum)
+        entry = (self.__currentSectionNum, self.__currentParent, sectionLabel,
+                 self.__document[self.__currentParent][sectionLabel])
+        self.__sections.append(entry)
+        self.__entries.append(entry)
+        self.__childSections.setdefault(self.__currentParent, []).append(entry)
         self.__currentSectionNum += 1
         if setToParent:
             self.__currentParent = sectionLabel
 
+    @staticmethod
+    def __current(entries, key):
+        """the entries of an index whose edge data still has their number"""
+        return [e for e in entries if e[3].get(key) == e[0]]
+
+    def __sectionEntries(self, index, sectionLabel, key):
+        """the current entries of index for sectionLabel ordered by number.
+        As for the out_edges of a graph sectionLabel can be a node or a
+        sequence of nodes"""
+        if sectionLabel in self.__document:
+            entries = index.get(sectionLabel, [])
+        else:
+            entries = [e for label in self.__document.nbunch_iter(sectionLabel)
+                       for e in index.get(label, [])]
+        entries = self.__current(entries, key)
+        entries.sort(key=lambda e: e[0])
+        return entries
+
     def getDocument(self):
         return self.__document
     def getCurrentSentenceNumber(self):
@@ -79,30 +117,74 @@ class ConTextDocument(object):
     def getUnicodeEncoding(self):
         return self.__unicodeEncoding
 
-    def addMarkup(self, markup):
+    def addMarkup(self, markup, offset=None, source=None):
         """
         add the markup as a node in the document attached to the current parent.
+        The markup (and its tags) records offset, the offset of its text in the
+        source document, and source, the text of the source document it was
+        made from when its whitespace differs (see
+        ConTextMarkupMixin.setDocumentOffset). Without offset the markup
+        records the offset of its text in the document text (see
+        getDocumentText).
         """
         # I'm not sure if I want to be using copy here
         self.__document.add_edge(self.__currentParent,markup,
                 category="markup",
                 sentenceNumber=self.__currentSentenceNum)
+        entry = (self.__currentSentenceNum, self.__currentParent, markup,
+                 self.__document[self.__currentParent][markup])
+        self.__markups.append(entry)
+        self.__entries.append(entry)
+        self.__sectionMarkups.setdefault(self.__currentParent, []).append(entry)
+        if offset is None:
+            markup.setDocumentOffset(self.__documentLength)
+        else:
+            markup.setDocumentOffset(offset, source)
+        self.__documentLength += len(markup.getText() or "") + 1
 
         self.__currentSentenceNum += 1
+
+    def getDocumentText(self):
+        """
+        return the text of the document: the text of each markup, in the order
+        the markups were added, followed by a space. The document offsets of the
+        markups added without an offset and the document spans of their tags
+        are relative to this text.
+        """
+        return "".join([(m.getText() or "")+" " for m in self.getMarkups()])
+
+    def getMarkups(self):
+        """return the markups of the document ordered by sentence number"""
+        return [e[2] for e in self.__current(self.__markups, 'sentenceNumber')]
     def retrieveMarkup(self,sentenceNumber):
         """
-        retrieve the markup corresponding to sentenceNumber
+        retrieve the markup corresponding to sentenceNumber, an integer or a
+        number equal to one (e.g. 1.0)
         """
-        edge = [e for e in self.__document.edges(data=True) if e[2]['category'] == "markup" and e[2]['sentenceNumber'] == sentenceNumber]
-        if edge:
-            return edge[0]
+        try:
+            sentenceNumber = operator.index(sentenceNumber)
+        except TypeError:
+            try:
+                if sentenceNumber != int(sentenceNumber):
+                    return None
+                sentenceNumber = int(sentenceNumber)
+            except (TypeError, ValueError, OverflowError):
+                return None
+        if 0 <= sentenceNumber < len(self.__markups):
+            edge = self.__current([self.__markups[sentenceNumber]], 'sentenceNumber')
+            if edge:
+                return edge[0][1:]
 
     def getSectionNodes(self,sectionLabel = None, category="markup"):
         if not sectionLabel:
             sectionLabel = self.__currentParent
-        successors = [(e[2]['__sectionNumber'],e[1]) for e in self.__document.out_edges(sectionLabel, data=True)
-                                                            if e[2].get("category") == category]
-        successors.sort()
+        if category == "section":
+            successors = [(e[0], e[2]) for e in
+                          self.__sectionEntries(self.__childSections, sectionLabel, '__sectionNumber')]
+        else:
+            successors = [(e[2]['__sectionNumber'],e[1]) for e in self.__document.out_edges(sectionLabel, data=True)
+                                                                if e[2].get("category") == category]
+            successors.sort()
         tmp = list(zip(*successors))
         return tmp[1]
 
@@ -110,9 +192,8 @@ class ConTextDocument(object):
         """return the markup graphs for the section ordered by sentence number"""
         if not sectionLabel:
             sectionLabel = self.__currentParent
-        successors = [(e[2]['sentenceNumber'],e[1]) for e in self.__document.out_edges(sectionLabel, data=True)
-                                                            if e[2].get("category") == "markup"]
-        successors.sort()
+        successors = [(e[0], e[2]) for e in
+                      self.__sectionEntries(self.__sectionMarkups, sectionLabel, 'sentenceNumber')]
         if returnSentenceNumbers:
             return successors
         else:
@@ -120,8 +201,7 @@ class ConTextDocument(object):
             return tmp[1]
 
     def getDocumentSections(self):
-        edges = [ (e[2]['__sectionNumber'],e[1]) for e in self.__document.edges(data=True) if e[2].get("category") == "section"]
-        edges.sort()
+        edges = [(e[0], e[2]) for e in self.__current(self.__sections, '__sectionNumber')]
         tmp = list(zip(*edges))
         if len(tmp) > 1:
             tmp = [self.__root, tmp[1]]
@@ -142,30 +222,74 @@ class ConTextDocument(object):
         return self.__documentGraph
 
     def getXML(self):
-        txt = ""
-# first generate string for all the sentences from the document in order to compute document level offsets
-        documentString = ""
-        sentenceOffsets = {}
+        return "".join(self.iterXML())
+
+    def writeXML(self, fp):
+        """write the XML representation of the document (see getXML) to the
+        file-like object fp one sentence at a time"""
+        fp.writelines(self.iterXML())
+
+    def iterXML(self):
+        """generate the XML representation of the document in pieces"""
+# first the text of all the sentences of the document, then the sentences with
+# their document offsets (see addMarkup)
         sections = self.getDocumentSections()
-        for s in sections:
-            markups = self.getSectionMarkups(s)
-            for m in markups:
-                sentenceOffsets[m[0]] = len(documentString)
-                documentString = documentString + m[1].getText()+" "
+        sectionMarkups = [(s, self.getSectionMarkups(s)) for s in sections]
 
-        txt += xmlScrub(documentString)
+        yield ConTextDocumentXMLHead
+        for s, markups in sectionMarkups:
+            for m in markups:
+                yield xmlScrub(m[1].getText()+" ")
         # get children sections of root
 
 
-        for s in sections:
-            txt += """<section>\n<sectionLabel> {0} </sectionLabel>\n""".format(s)
-            markups = self.getSectionMarkups(s)
+        for s, markups in sectionMarkups:
+            yield """<section>\n<sectionLabel> {0} </sectionLabel>\n""".format(s)
             for m in markups:
-                txt += "<sentence>\n<sentenceNumber> %d </sentenceNumber>\n<sentenceOffset> %d </sentenceOffset></sentence>\n%s"%(
-                    (m[0],sentenceOffsets[m[0]],m[1].getXML()))
-            txt += """</section>\n"""
+                yield "<sentence>\n<sentenceNumber> %d </sentenceNumber>\n<sentenceOffset> %d </sentenceOffset></sentence>\n"%(
+                    m[0],m[1].getDocumentOffset())
+                for piece in m[1].iterXML():
+                    yield piece
+            yield """</section>\n"""
+        yield ConTextDocumentXMLTail
+    def toDict(self):
+        """return a dictionary of the document holding only strings, numbers
+        and lists, e.g. to be written as JSON: the sections and markups (see
+        ConTextMarkup.toDict) in the order they were added with their parent
+        section. fromDict rebuilds the document from the dictionary"""
+        content = []
+        for e in self.__entries:
+            if e[3].get('category') == "markup":
+                if e[3].get('sentenceNumber') == e[0]:
+                    content.append({"parent": e[1], "markup": e[2].toDict()})
+            elif e[3].get('__sectionNumber') == e[0]:
+                content.append({"parent": e[1], "section": e[2]})
+        return {"content": content, "currentParent": self.__currentParent}
+
+    def toJSON(self):
+        return json.dumps(self.toDict(), ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def fromDict(cls, document, unicodeEncoding='utf-8', markupClass=ConTextMarkup, tagIDs=None):
+        """rebuild a document from a dictionary returned by toDict; its markups
+        are rebuilt as markupClass (see ConTextMarkup.fromDict)"""
+        obj = cls(unicodeEncoding)
+        items = {}
+        for entry in document["content"]:
+            obj.setParent(entry["parent"])
+            if "section" in entry:
+                obj.insertSection(entry["section"])
+            else:
+                markup = markupClass.fromDict(entry["markup"], unicodeEncoding,
+                                              tagIDs=tagIDs, items=items)
+                obj.addMarkup(markup, offset=markup.getDocumentOffset())
+        obj.setParent(document["currentParent"])
+        return obj
+
+    @classmethod
+    def fromJSON(cls, txt, **kwargs):
+        return cls.fromDict(json.loads(txt), **kwargs)
 
-        return ConTextDocumentXMLSkel.format(txt)
     def __unicode__(self):
         txt = '_'*42+"\n"
         return txt
@@ -176,26 +300,40 @@ class ConTextDocument(object):
 
     def computeDocumentGraph(self, verbose=False):
         """Create a single document graph from the union of the graphs created
-           for each sentence in the archive. Note that the algorithm in NetworkX
-           is different based on whether the Python version is greater than or
-           equal to 2.6"""
+           for each sentence in the archive. The graph is built in one pass
+           with the nodes and edges in the order repeated calls of nx.union
+           produced (the last sentence first)"""
         # Note that this as written does not include the currentGraph in the DocumentGraph
         # Maybe this should be changed
-        self.__documentGraph = ConTextMarkup()
+        documentGraph = ConTextMarkup()
         if verbose:
-            print("Document markup has {0d} edges".format(self.__document.number_of_edges()))
+            print("Document markup has {0:d} edges".format(self.__document.number_of_edges()))
         markups = [e[1] for e in self.__document.edges(data=True) if e[2].get('category') == 'markup']
         if verbose:
-            print("Document markup has {0d} conTextMarkup objects".format(len(markups)))
+            print("Document markup has {0:d} conTextMarkup objects".format(len(markups)))
+        graphs = []
+        numNodes = 0
         for i in range(len(markups)):
-        #for m in markups:
-            m = markups[i]
+            m = markups[i].toDiGraph()
             if verbose:
-                print("markup {0d} has {1d} total items including {2d} targets".format(i,m.number_of_nodes(),m.getNumMarkedTargets()))
-
-            self.__documentGraph = nx.union(m,self.__documentGraph)
-            if verbose:
-                print("documentGraph now has {0d} nodes".format(self.__documentGraph.number_of_nodes()))
+                print("markup {0:d} has {1:d} total items including {2:d} targets".format(i,m.number_of_nodes(),m.getNumMarkedTargets()))
+            graphs.append(m)
+            numNodes += m.number_of_nodes()
+        graphs.reverse()
+        # graph attributes of earlier sentences (and of the empty markup) win
+        attributes = dict(documentGraph.graph)
+        for m in graphs:
+            documentGraph.graph.update(m.graph)
+        documentGraph.graph.update(attributes)
+        for m in graphs:
+            documentGraph.add_nodes_from(m.nodes(data=True))
+        if documentGraph.number_of_nodes() != numNodes:
+            raise nx.NetworkXError("The node sets of the graphs are not disjoint.")
+        for m in graphs:
+            documentGraph.add_edges_from(m.edges(data=True))
+        self.__documentGraph = documentGraph
+        if verbose:
+            print("documentGraph now has {0:d} nodes".format(self.__documentGraph.number_of_nodes()))
 
 
 
@@ -0,0 +1,107 @@
+#Copyright 2010 Brian E. Chapman
+#
+#Licensed under the Apache License, Version 2.0 (the "License");
+#you may not use this file except in compliance with the License.
+#You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+#Unless required by applicable law or agreed to in writing, software
+#distributed under the License is distributed on an "AS IS" BASIS,
+#WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#See the License for the specific language governing permissions and
+#limitations under the License.
+"""
+Streaming the ConText pipeline over report corpora with bounded memory.
+
+    from pyConTextNLP import stream
+    reports = stream.read_jsonl("reports.jsonl", text_key="report", id_key="id")
+    for report_id, targets in stream.stream(reports, modifiers, targets,
+                                            extract=stream.findings):
+        ...
+
+Reports are read lazily (read_jsonl, read_csv or any iterable of texts or
+(id, text) pairs) and the results are generated as the documents are
+processed (by batch.iprocess), in input order. Only the documents in flight are
+held in memory; with an extract function such as findings the ConTextDocument
+graphs are dropped in the worker once the findings are extracted.
+"""
+import collections
+import csv
+import json
+
+from . import batch
+from .utils import get_document_markups
+
+
+def read_jsonl(path, text_key="text", id_key=None, encoding="utf-8"):
+    """
+    generate (id, text) for each JSON object of the JSON lines file path.
+    text_key: key of the report text
+    id_key: key of the report id; by default the line number (from 0)
+    """
+    with open(path, encoding=encoding) as f0:
+        for line_number, line in enumerate(f0):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield (line_number if id_key is None else record[id_key]), record[text_key]
+
+
+def read_csv(path, text_column="text", id_column=None, encoding="utf-8", **fmtparams):
+    """
+    generate (id, text) for each row of the CSV file path, whose first row
+    names the columns.
+    text_column: column of the report text
+    id_column: column of the report id; by default the row number (from 0)
+    fmtparams: csv format parameters (e.g. delimiter="\\t")
+    """
+    with open(path, encoding=encoding, newline="") as f0:
+        for row_number, row in enumerate(csv.DictReader(f0, **fmtparams)):
+            yield (row_number if id_column is None else row[id_column]), row[text_column]
+
+
+def findings(document):
+    """
+    return the marked targets of document as plain data: for each target (in
+    sentence and span order) a dictionary with the sentence number, phrase,
+    categories and span of the target and the list of its modifiers (phrase,
+    categories and span)
+    """
+    results = []
+    for sentence, markup in enumerate(get_document_markups(document)):
+        for target in markup.getMarkedTargets():
+            results.append({"sentence":sentence,
+                            "phrase":target.getPhrase(),
+                            "category":target.getCategory(),
+                            "span":target.getSpan(),
+                            "modifiers":[{"phrase":modifier.getPhrase(),
+                                          "category":modifier.getCategory(),
+                                          "span":modifier.getSpan()}
+                                         for modifier in markup.getModifiers(target)]})
+    return results
+
+
+def stream(reports, modifiers, targets, extract=None, **options):
+    """
+    generate (id, result) for each report of reports, in input order.
+
+    reports: iterable of (id, text) pairs (e.g. read_jsonl or read_csv) or of
+    texts, whose id is then their position (from 0)
+    extract: function of the ConTextDocument of a report (e.g. findings)
+    generating the result instead of the document
+    options: passed to batch.iprocess (workers, chunksize, max_in_flight,
+    splitter, prune_inactive, ...)
+    """
+    # ids of the reports read and not yet generated
+    ids = collections.deque()
+    def texts():
+        for position, report in enumerate(reports):
+            if isinstance(report, str):
+                ids.append(position)
+                yield report
+            else:
+                ids.append(report[0])
+                yield report[1]
+    for result in batch.iprocess(texts(), modifiers, targets, extract=extract, **options):
+        yield ids.popleft(), result
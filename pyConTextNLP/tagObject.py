@@ -3,8 +3,11 @@ tabObject module
 """
 
 import uuid
-import copy
+import json
+import random
+import threading
 from .io.xml import xmlScrub
+from .itemData import Rule, contextItem
 
 tagObjectXMLSkel=\
 """
@@ -21,6 +24,81 @@ tagObjectXMLSkel=\
 """
 
 
+class uuidTagIDs(object):
+    """
+    tag id strategy returning uuid1 integers (the original pyConText ids).
+    Ids are unique across processes and machines but costly to create.
+    """
+    def __call__(self):
+        return uuid.uuid1().int
+
+
+class counterTagIDs(object):
+    """
+    tag id strategy returning sequential integers starting at start.
+    Ids are unique for the counter: use one counter per process (the default
+    strategy) or one counter per document for small per-document ids.
+
+    A pickled counter continues from the same next id as the counter it was
+    pickled from, so the two return the same ids: a counter must not be shared
+    by several processes (e.g. passed as the tagIDs option of batch.process).
+    """
+    def __init__(self, start=1):
+        self.__next = start
+        self.__lock = threading.Lock()
+
+    def __call__(self):
+        with self.__lock:
+            tagid = self.__next
+            self.__next = tagid + 1
+        return tagid
+
+    def __getstate__(self):
+        return {"start":self.__next}
+
+    def __setstate__(self, state):
+        self.__init__(state["start"])
+
+
+_TAG_IDS = counterTagIDs()
+
+
+def set_tag_id_strategy(strategy):
+    """
+    set the process wide tag id strategy used when no strategy is given to
+    ConTextMarkup. strategy is any callable returning a new id on each call,
+    e.g. counterTagIDs() (the default) or uuidTagIDs(). Returns the previous
+    strategy.
+    """
+    global _TAG_IDS
+    previous = _TAG_IDS
+    _TAG_IDS = strategy
+    return previous
+
+
+def worker_tag_ids():
+    """
+    return a counterTagIDs starting at a random multiple of 2**32 below 2**63.
+    Used as the process wide strategy of worker processes (see batch.process)
+    so that the ids of the tags created by different processes do not collide
+    while staying 64 bit integers.
+    """
+    # a prefix of 0 would give the ids of a process counting from 1
+    return counterTagIDs(start=(random.getrandbits(31) or 1) << 32)
+
+
+def get_tag_id_strategy():
+    """return the process wide tag id strategy"""
+    return _TAG_IDS
+
+
+def create_tag_id():
+    """
+    get a unique identifier from the process wide tag id strategy
+    """
+    return _TAG_IDS()
+
+
 class tagObject(object):
     """
     A class that describes terms of interest in the text.
@@ -28,7 +106,15 @@ class tagObject(object):
     1) The contextItem defining the tag
     3) The location of the tag within the text being parsed
 
+    Tags are held in large numbers so attributes are slotted, spans and scopes
+    are stored as integers and the category tuple is shared with the
+    contextItem until it is changed with setCategory or replaceCategory.
     """
+    __slots__ = ("__item", "__category", "__spanStart", "__spanEnd",
+                 "__scopeStart", "__scopeEnd", "__foundPhrase", "__foundDict",
+                 "__ConTextCategory", "__tagID", "__documentOffset",
+                 "__documentEndOffset")
+
     def __init__(self, item, ConTextCategory, scope=None, tagid=None, **kwargs):
         """
         item: contextItem used to generate term
@@ -37,20 +123,20 @@ class tagObject(object):
         variants
         """
         self.__item = item
-        self.__category = self.__item.getCategory()
+        self.__category = self.__item.getCategoryTuple()
         self.__spanStart = 0
         self.__spanEnd = 0
         self.__foundPhrase = ''
-        self.__foundDict = {}
+        self.__foundDict = None
         self.__ConTextCategory = ConTextCategory
-        if not tagid:
-            tagid = uuid.uid1().int
+        self.__documentOffset = self.__documentEndOffset = 0
+        if tagid is None:
+            tagid = create_tag_id()
         self.__tagID = tagid
-        if scope == None:
-            self.__scope = []
+        if scope is None:
+            self.__scopeStart = self.__scopeEnd = None
         else:
-            self.__scope = list(scope)
-        self.__SCOPEUPDATED = False
+            self.__scopeStart, self.__scopeEnd = scope
 
 
     def setScope(self):
@@ -59,10 +145,11 @@ class tagObject(object):
         Currently only "forward" and "backward" rules are implemented
         """
 
-        if 'forward' in self.__item.getRule().lower():
-            self.__scope[0] = self.getSpan()[1]
-        elif 'backward' in self.__item.getRule().lower():
-            self.__scope[1] = self.getSpan()[0]
+        rule = self.__item.getParsedRule()
+        if rule is Rule.FORWARD:
+            self.__scopeStart = self.__spanEnd
+        elif rule is Rule.BACKWARD:
+            self.__scopeEnd = self.__spanStart
 
 
     def getTagID(self):
@@ -75,43 +162,47 @@ class tagObject(object):
 
 
     def getScope(self):
-        return self.__scope
+        if self.__scopeStart is None:
+            return []
+        return [self.__scopeStart, self.__scopeEnd]
 
 
     def getRule(self):
         return self.__item.getRule()
 
 
+    def getParsedRule(self):
+        return self.__item.getParsedRule()
+
+
     def limitScope(self, obj):
         """If self and obj are of the same category or if obj has a rule of
         'terminate', use the span of obj to
         update the scope of self
         returns True if a obj modified the scope of self"""
-        if not self.getRule() or self.getRule()== 'terminate' or \
-             (not self.isA(obj.getCategory()) and obj.getRule() != 'terminate'):
-            return False
-        originalScope = copy.copy((self.getScope()))
-        if 'forward' in self.getRule().lower() or \
-            'bidirectional' in self.getRule().lower():
-            if obj > self:
-                self.__scope[1] = min(self.__scope[1],obj.getSpan()[0])
-        elif 'backward' in self.getRule().lower() or \
-              'bidirectional' in self.getRule().lower():
-            if obj < self:
-                self.__scope[0] = max(self.__scope[0],obj.getSpan()[1])
-        if originalScope != self.__scope:
-            return True
-        else:
+        rule = self.getParsedRule()
+        if rule is Rule.NONE or rule is Rule.TERMINATE or \
+             (not self.isA(obj.getCategory()) and obj.getParsedRule() is not Rule.TERMINATE):
             return False
+        if rule is Rule.FORWARD or rule is Rule.BIDIRECTIONAL:
+            if obj > self and obj.__spanStart < self.__scopeEnd:
+                self.__scopeEnd = obj.__spanStart
+                return True
+        elif rule is Rule.BACKWARD:
+            if obj < self and obj.__spanEnd > self.__scopeStart:
+                self.__scopeStart = obj.__spanEnd
+                return True
+        return False
 
 
     def applyRule(self, term):
         """applies self's rule to term. If the start of term lines within
         the span of self, then term may be modified by self"""
-        if not self.getRule() or self.getRule() == 'terminate':
+        rule = self.getParsedRule()
+        if rule is Rule.NONE or rule is Rule.TERMINATE:
             return False
-        if self.__scope[0] <= term.getSpan()[0] <= self.__scope[1]:
-            return True 
+        if self.__scopeStart <= term.getSpan()[0] <= self.__scopeEnd:
+            return True
 
 
     def getConTextCategory(self):
@@ -119,10 +210,77 @@ class tagObject(object):
 
 
     def getXML(self):
+        span = self.getSpan()
+        scope = self.getScope()
         return   tagObjectXMLSkel.format(self.getTagID(),xmlScrub(self.getPhrase()),
                                    xmlScrub(self.getLiteral()),xmlScrub(self.getCategory()),
-                                   self.getSpan()[0],self.getSpan()[1],
-                                   self.getScope()[0],self.getScope()[1])
+                                   span[0],span[1],
+                                   scope[0],scope[1])
+
+
+    def toDict(self):
+        """
+        return a dictionary of the tag (and of the contextItem defining it)
+        holding only strings, numbers and lists, e.g. to be written as JSON.
+        fromDict rebuilds the tag from the dictionary
+        """
+        item = self.__item
+        tag = {"id": self.__tagID,
+               "mode": self.__ConTextCategory,
+               "phrase": self.__foundPhrase,
+               "literal": item.getLiteral(),
+               "category": list(self.__category),
+               "re": "" if item.isLiteral() else item.getRE(),
+               "rule": item.getRule(),
+               "span": [self.__spanStart, self.__spanEnd],
+               "scope": self.getScope()}
+        if item.getCategoryTuple() != self.__category:
+            tag["itemCategory"] = item.getCategory()
+        if self.__foundDict:
+            tag["groups"] = dict(self.__foundDict)
+        if self.__documentOffset:
+            tag["documentOffset"] = self.__documentOffset
+        if self.__documentEndOffset != self.__documentOffset:
+            tag["documentEndOffset"] = self.__documentEndOffset
+        return tag
+
+
+    def toJSON(self):
+        return json.dumps(self.toDict(), ensure_ascii=False, separators=(",", ":"))
+
+
+    @classmethod
+    def fromDict(cls, tag, items=None, tagIDs=None):
+        """
+        rebuild a tag from a dictionary returned by toDict. items is an
+        optional dictionary used to share the contextItems of the tags
+        rebuilt with it. The tag gets a new id from the tag id strategy tagIDs
+        (by default the process wide strategy): the stored id may be that of
+        another tag of the loading process
+        """
+        args = (tag["literal"], ",".join(tag.get("itemCategory", tag["category"])),
+                tag["re"], tag["rule"])
+        if items is None:
+            item = contextItem(args)
+        else:
+            item = items.get(args)
+            if item is None:
+                item = items[args] = contextItem(args)
+        obj = cls(item, tag["mode"], scope=tag["scope"] or None,
+                  tagid=tagIDs() if tagIDs is not None else None)
+        obj.setSpan(tag["span"])
+        obj.setPhrase(tag["phrase"])
+        if tuple(tag["category"]) != item.getCategoryTuple():
+            obj.setCategory(tag["category"])
+        if tag.get("groups"):
+            obj.setMatchedGroupDictionary(tag["groups"])
+        obj.setDocumentOffset(tag.get("documentOffset", 0), tag.get("documentEndOffset"))
+        return obj
+
+
+    @classmethod
+    def fromJSON(cls, txt, **kwargs):
+        return cls.fromDict(json.loads(txt), **kwargs)
 
 
     def getBriefDescription(self):
@@ -139,7 +297,7 @@ class tagObject(object):
 
     def getCategory(self):
         """returns the category (e.g. CONJUNCTION) for this object"""
-        return self.__category[:]
+        return list(self.__category)
 
 
     def categoryString(self):
@@ -151,17 +309,19 @@ class tagObject(object):
 
 
     def setCategory(self,category):
-        self.__category = category
+        self.__category = tuple(category)
 
 
     def replaceCategory(self,oldCategory, newCategory):
-        for index, item in enumerate(self.__category):
+        category = list(self.__category)
+        for index, item in enumerate(category):
             if item == oldCategory.lower().strip():
                 try:
-                    self.__category[index] = newCategory.lower().strip()
+                    category[index] = newCategory.lower().strip()
                 except:
-                    del self.__category[index]
-                    self.__category.extend([nc.lower().strip() for nc in newCategory])
+                    del category[index]
+                    category.extend([nc.lower().strip() for nc in newCategory])
+        self.__category = tuple(category)
 
 
     def setSpan(self, span):
@@ -174,6 +334,24 @@ class tagObject(object):
         """return the span within the associated text for this object"""
         return self.__spanStart,self.__spanEnd
 
+
+    def setDocumentOffset(self, offset, endOffset=None):
+        """set the offset of the associated text (sentence) in its document.
+        endOffset is the offset of the end of the span when it differs (e.g.
+        the span covers whitespace collapsed in the associated text)"""
+        self.__documentOffset = offset
+        self.__documentEndOffset = offset if endOffset is None else endOffset
+
+
+    def getDocumentOffset(self):
+        return self.__documentOffset
+
+
+    def getDocumentSpan(self):
+        """return the span of this object within the text of its document
+        (see ConTextDocument.addMarkup)"""
+        return self.__spanStart+self.__documentOffset,self.__spanEnd+self.__documentEndOffset
+
     def setPhrase(self, phrase):
         """set the actual matched phrase used to generate this object"""
         self.__foundPhrase = phrase
@@ -186,11 +364,13 @@ class tagObject(object):
 
     def setMatchedGroupDictionary(self, mdict):
         """set the foundDict variable to mdict. This gets the name/value pair for each NAMED group within the regular expression"""
-        self.__foundDict = mdict.copy()
+        self.__foundDict = mdict.copy() if mdict else None
 
 
     def getMatchedGroupDictionary(self):
         """return a copy of the matched group dictionary"""
+        if not self.__foundDict:
+            return {}
         return self.__foundDict.copy()
 
 
@@ -201,15 +381,31 @@ class tagObject(object):
 
     def __lt__(self, other): return self.__spanStart < other.__spanStart
     def __le__(self, other): return self.__spanStart <= other.__spanStart
-    def __eq__(self, other):
-        return (self.__spanStart == other.__spanStart and
-                self.__spanEnd == other.__spanEnd)
-    def __ne__(self, other): return self.__spanStart != other.__spanStart
     def __gt__(self, other): return self.__spanStart > other.__spanStart
     def __ge__(self, other): return self.__spanStart >= other.__spanStart
 
+    # tagObjects are ordered by span but identified by their tag id, so that
+    # hashing (e.g. every NetworkX node lookup) is O(1) and consistent with
+    # equality. Tag ids must therefore be unique among the tags compared: the
+    # process wide strategy (the default of ConTextMarkup and markup_document)
+    # gives ids unique across documents, a per-document counterTagIDs does not.
+    def __eq__(self, other):
+        if not isinstance(other, tagObject):
+            return NotImplemented
+        return self.__tagID == other.__tagID
+    def __ne__(self, other):
+        if not isinstance(other, tagObject):
+            return NotImplemented
+        return self.__tagID != other.__tagID
+
     def __hash__(self):
-        return hash(repr(self))
+        return hash(self.__tagID)
+
+
+    def sameSpan(self, other):
+        """tests whether other has the same span as self"""
+        return self.__spanStart == other.__spanStart and \
+               self.__spanEnd == other.__spanEnd
 
 
     def encompasses(self, other):
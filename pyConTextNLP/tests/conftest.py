@@ -0,0 +1,58 @@
+import re
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.tagObject import counterTagIDs
+import pytest
+
+@pytest.fixture(scope="module")
+def modifiers():
+    return [itemData.contextItem(i) for i in
+            [["no gross evidence of", "PROBABLE_NEGATED_EXISTENCE", "", "forward"],
+             ["no", "DEFINITE_NEGATED_EXISTENCE", "", "forward"],
+             ["no evidence of", "DEFINITE_NEGATED_EXISTENCE", "", "forward"],
+             ["history", "HISTORICAL", "", "forward"],
+             ["free", "DEFINITE_NEGATED_EXISTENCE", "", "forward"],
+             ["cannot be excluded", "AMBIVALENT_EXISTENCE", "", "backward"],
+             ["but", "CONJ", "", "terminate"],
+             ["to suggest", "PSEUDONEG", "", "bidirectional"]]]
+
+@pytest.fixture(scope="module")
+def targets():
+    return [itemData.contextItem(i) for i in
+            [["pulmonary embolism", "PULMONARY_EMBOLISM",
+              r"""pulmonary\s(artery )?(embol[a-z]+)""", ""],
+             ["pneumonia", "PNEUMONIA", "", ""],
+             ["chronic pneumonia", "EXCLUSION", "", ""],
+             ["free air", "PNEUMOPERITONEUM", "", ""]]]
+
+
+def _stepwise_markup(s, modifiers, targets, cls=ConTextMarkup, prune_inactive=True,
+                     drop_category="exclusion", tagIDs=None):
+    """run the ConText pipeline on s one ConTextMarkup method at a time"""
+    markup = cls(tagIDs=tagIDs or counterTagIDs())
+    markup.setRawText(s)
+    markup.cleanText()
+    markup.markItems(modifiers, mode="modifier")
+    markup.markItems(targets, mode="target")
+    markup.pruneMarks()
+    if drop_category is not None:
+        markup.dropMarks(drop_category)
+    markup.applyModifiers()
+    markup.pruneSelfModifyingRelationships()
+    if prune_inactive:
+        markup.dropInactiveModifiers()
+    return markup
+
+@pytest.fixture
+def stepwise_markup():
+    return _stepwise_markup
+
+
+def _xml_without_ids(document):
+    """the XML of document (or markup) without the tag ids, which differ between runs"""
+    return re.sub(r"<(id|modifyingNode|modifiedNode|startNode|endNode)> \d+ </\1>", "",
+                  document.getXML())
+
+@pytest.fixture
+def xml_without_ids():
+    return _xml_without_ids
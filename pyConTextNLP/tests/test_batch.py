@@ -0,0 +1,49 @@
+from pyConTextNLP import batch
+from pyConTextNLP.pipeline import markup_document
+from pyConTextNLP.tagObject import counterTagIDs
+import pytest
+
+@pytest.fixture(scope="module")
+def documents():
+    return ['No pulmonary embolism. There is pneumonia.',
+            'IMPRESSION: 1. LIMITED STUDY DEMONSTRATING NO GROSS EVIDENCE OF SIGNIFICANT PULMONARY EMBOLISM.',
+            '',
+            'Pulmonary embolism cannot be excluded. No pneumonia, but pulmonary embolism.']*3
+
+
+def test_process_in_process(documents, modifiers, targets, xml_without_ids):
+    results = batch.process(documents, modifiers, targets, workers=0, chunksize=5)
+    assert [xml_without_ids(r) for r in results] == \
+           [xml_without_ids(markup_document(d, modifiers, targets)) for d in documents]
+
+
+def test_process_pool_keeps_input_order(documents, modifiers, targets, xml_without_ids):
+    expected = [xml_without_ids(r)
+                for r in batch.process(documents, modifiers, targets, workers=0)]
+    results = batch.process(iter(documents), modifiers, targets, workers=2,
+                            chunksize=1, max_in_flight=3)
+    assert [xml_without_ids(r) for r in results] == expected
+    # tags of documents processed by different workers never compare equal
+    tags = [tag for r in results for markup in r.getMarkups() for tag in markup.nodes()]
+    assert len(set(tags)) == len(tags)
+    assert all(0 < tag.getTagID() < 2**63 for tag in tags)
+
+
+def test_iprocess_close_early(documents, modifiers, targets, xml_without_ids):
+    results = batch.iprocess(documents, modifiers, targets, workers=2, chunksize=1)
+    assert xml_without_ids(next(results)) == \
+        xml_without_ids(markup_document(documents[0], modifiers, targets))
+    results.close()
+
+
+def test_process_pool_rejects_tag_ids(documents, modifiers, targets):
+    with pytest.raises(ValueError):
+        batch.process(documents, modifiers, targets, workers=2, tagIDs=counterTagIDs())
+    results = batch.process(documents[:2], modifiers, targets, workers=0, tagIDs=counterTagIDs())
+    tags = [tag for r in results for markup in r.getMarkups() for tag in markup.nodes()]
+    assert len(set(tags)) == len(tags)
+
+
+def test_process_invalid_chunksize(documents, modifiers, targets):
+    with pytest.raises(ValueError):
+        batch.process(documents, modifiers, targets, workers=0, chunksize=0)
@@ -0,0 +1,64 @@
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP import columnar, stream
+from pyConTextNLP.pipeline import markup_document
+import pytest
+
+@pytest.fixture(scope="module")
+def documents():
+    modifiers = [itemData.contextItem(i) for i in
+                 [["no", "DEFINITE_NEGATED_EXISTENCE", "", "forward"],
+                  ["history of", "HISTORICAL, INDICATION", "", "forward"]]]
+    targets = [itemData.contextItem(i) for i in
+               [["pulmonary embolism", "PULMONARY_EMBOLISM", "", ""],
+                ["pneumonia", "PNEUMONIA", "", ""]]]
+    return [("r1", markup_document('No history of pneumonia. Pulmonary embolism.',
+                                   modifiers, targets)),
+            ("r2", markup_document('', modifiers, targets)),
+            ("r3", markup_document('No pulmonary embolism or pneumonia.',
+                                   modifiers, targets))]
+
+
+def test_table_matches_findings(documents):
+    columns = columnar.table(documents)
+    rows = [(i, f) for i, document in documents for f in stream.findings(document)]
+    assert columns["doc_id"] == [i for i, f in rows]
+    assert columns["sentence"] == [f["sentence"] for i, f in rows]
+    assert columns["phrase"] == [f["phrase"] for i, f in rows]
+    assert columns["category"] == [",".join(f["category"]) for i, f in rows]
+    assert list(zip(columns["span_start"], columns["span_end"])) == [f["span"] for i, f in rows]
+    assert columns["modifier_count"] == [len(f["modifiers"]) for i, f in rows]
+    assert columns["modifier_category"] == \
+        [",".join(m["category"]) for i, f in rows for m in f["modifiers"]]
+    assert columns["modifier_category"][:2] == ["definite_negated_existence", "historical,indication"]
+    assert columnar.table((i, columnar.document_columns(d)) for i, d in documents) == columns
+    assert columnar.table(d for i, d in documents)["doc_id"] == [0, 0, 2, 2]
+
+
+def test_write_npz(tmp_path, documents):
+    numpy = pytest.importorskip("numpy")
+    columns = columnar.table(documents)
+    path = str(tmp_path / "findings.npz")
+    assert columnar.write(columns, path) == "npz"
+    arrays = numpy.load(path)
+    assert sorted(arrays.files) == sorted(columnar.COLUMNS)
+    for name in columnar.COLUMNS:
+        assert arrays[name].tolist() == columns[name]
+
+
+@pytest.mark.parametrize("name", ["findings.arrow", "findings.parquet"])
+def test_write_arrow(tmp_path, documents, name):
+    pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+    columns = columnar.table(documents)
+    path = str(tmp_path / name)
+    columnar.write(columns, path)
+    if name.endswith(".parquet"):
+        arrowTable = pyarrow.parquet.read_table(path)
+    else:
+        arrowTable = pyarrow.ipc.open_file(path).read_all()
+    assert arrowTable.column_names == list(columnar.COLUMNS)
+    assert arrowTable.column("span_start").to_pylist() == columns["span_start"]
+    assert arrowTable.column("modifier_category").to_pylist() == \
+        [["definite_negated_existence", "historical,indication"], [],
+         ["definite_negated_existence"], ["definite_negated_existence"]]
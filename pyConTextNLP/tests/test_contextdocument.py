@@ -0,0 +1,228 @@
+import io
+import os
+import networkx as nx
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.ConTextMarkupLite import ConTextMarkupLite
+from pyConTextNLP.pipeline import markup_document, markup_sentence
+from pyConTextNLP.pyConText import ConTextDocument
+from pyConTextNLP.tagObject import counterTagIDs
+from pyConTextNLP.io.xml import xmlScrub
+from pyConTextNLP.io.json import dump_documents, load_documents
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="module")
+def sentences():
+    return ['No pulmonary embolism.',
+            'There   is pneumonia.',
+            'Pulmonary embolism cannot be excluded, but no pneumonia.']
+
+
+@pytest.fixture
+def document(sentences, modifiers, targets):
+    document = ConTextDocument()
+    tagIDs = counterTagIDs()
+    for i, s in enumerate(sentences):
+        markup_class = ConTextMarkupLite if i % 2 else ConTextMarkup
+        document.addMarkup(markup_sentence(s, modifiers, targets, tagIDs=tagIDs,
+                                           markup_class=markup_class))
+    return document
+
+
+def get_markups(document):
+    markups = [(e[2]['sentenceNumber'], e[1]) for e in document.getDocument().edges(data=True)
+               if e[2].get('category') == "markup"]
+    return [m[1] for m in sorted(markups, key=lambda m: m[0])]
+
+
+def test_document_text(document):
+    assert document.getDocumentText() == \
+        'No pulmonary embolism. There is pneumonia. ' \
+        'Pulmonary embolism cannot be excluded, but no pneumonia. '
+
+
+def test_document_offsets(document):
+    text = document.getDocumentText()
+    markups = get_markups(document)
+    assert [m.getDocumentOffset() for m in markups] == [0, 23, 43]
+    for markup in markups:
+        offset = markup.getDocumentOffset()
+        assert text[offset:offset+len(markup.getText())] == markup.getText()
+        for tag in markup.nodes():
+            start, end = tag.getDocumentSpan()
+            assert text[start:end] == markup.getText()[tag.getSpan()[0]:tag.getSpan()[1]]
+
+
+def test_document_offset_of_new_tags(document, targets):
+    markup = get_markups(document)[2]
+    markup.markItems(targets, mode="target")
+    assert all(tag.getDocumentOffset() == 43 for tag in markup.nodes())
+
+
+def test_document_xml_offsets(document):
+    xml = document.getXML()
+    assert xml.count("<sentenceOffset>") == 3
+    assert "<sentenceOffset> 43 </sentenceOffset>" in xml
+
+
+def test_source_document_offsets(modifiers, targets, xml_without_ids):
+    text = "  No pulmonary\n   embolism.\n\nThere   is  pneumonia.  "
+    document = markup_document(text, modifiers, targets, tagIDs=counterTagIDs())
+    markups = get_markups(document)
+    assert [m.getDocumentOffset() for m in markups] == [2, 29]
+    phrases = []
+    for markup in markups:
+        for tag in markup.nodes():
+            start, end = tag.getDocumentSpan()
+            assert " ".join(text[start:end].split()) == tag.getPhrase()
+            phrases.append(text[start:end])
+    assert sorted(phrases) == ["No", "pneumonia", "pulmonary\n   embolism"]
+    xml = document.getXML()
+    assert "<sentenceOffset> 29 </sentenceOffset>" in xml
+    loaded = ConTextDocument.fromJSON(document.toJSON())
+    assert [tag.getDocumentSpan() for m in get_markups(loaded) for tag in m.nodes()] == \
+        [tag.getDocumentSpan() for m in markups for tag in m.nodes()]
+    assert xml_without_ids(loaded) == xml_without_ids(document)
+    markups[1].markItems(targets, mode="target")
+    assert [text[slice(*tag.getDocumentSpan())] for tag in markups[1].nodes()
+            if tag.getPhrase() == "pneumonia"] == ["pneumonia", "pneumonia"]
+
+
+def test_indexed_lookups_match_edges(document, sentences, modifiers, targets):
+    document.insertSection("IMPRESSION", setToParent=True)
+    document.addMarkup(markup_sentence(sentences[0], modifiers, targets,
+                                       tagIDs=counterTagIDs()))
+    document.insertSection("FINDINGS", setToParent=False)
+    edges = list(document.getDocument().edges(data=True))
+    assert document.getMarkups() == get_markups(document)
+    for e in edges:
+        if e[2].get('category') == "markup":
+            assert document.retrieveMarkup(e[2]['sentenceNumber']) == e
+    assert document.retrieveMarkup(len(sentences)+1) is None
+    sections = sorted((e[2]['__sectionNumber'], e[1]) for e in edges
+                      if e[2].get('category') == "section")
+    assert document.getDocumentSections() == ["document", tuple(s for n, s in sections)]
+    assert document.getSectionNodes("IMPRESSION", category="section") == ("FINDINGS",)
+    assert [m for n, m in document.getSectionMarkups("IMPRESSION")] == get_markups(document)[-1:]
+    assert document.getSectionMarkups("IMPRESSION", returnSentenceNumbers=False) == \
+        tuple(get_markups(document)[-1:])
+
+
+def test_document_graph_matches_union(document):
+    expected = ConTextMarkup()
+    for markup in get_markups(document):
+        expected = nx.union(markup.toDiGraph(), expected)
+    graph = document.getDocumentGraph()
+    assert type(graph) is type(expected)
+    assert graph.graph == expected.graph
+    assert list(graph.nodes(data=True)) == list(expected.nodes(data=True))
+    assert list(graph.edges(data=True)) == list(expected.edges(data=True))
+    assert graph.getConTextModeNodes("target") == expected.getConTextModeNodes("target")
+
+
+def test_document_graph_not_disjoint(document, sentences, modifiers, targets):
+    # a new tag id counter reuses the ids of the tags already in the document
+    document.addMarkup(markup_sentence(sentences[0], modifiers, targets,
+                                       tagIDs=counterTagIDs()))
+    with pytest.raises(nx.NetworkXError):
+        document.computeDocumentGraph()
+
+
+class SentenceNumber(object):
+    """an integer that is not an int (e.g. numpy.int64)"""
+    def __init__(self, value):
+        self.value = value
+    def __index__(self):
+        return self.value
+
+
+def test_retrieveMarkup_integer_like(document):
+    expected = document.retrieveMarkup(0)
+    assert expected is not None
+    assert document.retrieveMarkup(SentenceNumber(0)) == expected
+    assert document.retrieveMarkup(SentenceNumber(-1)) is None
+    assert document.retrieveMarkup("0") is None
+    assert document.retrieveMarkup(1.0) == document.retrieveMarkup(1)
+    assert document.retrieveMarkup(0.5) is None
+    assert document.retrieveMarkup(float("nan")) is None
+    assert document.retrieveMarkup(float("inf")) is None
+    numpy = pytest.importorskip("numpy")
+    assert document.retrieveMarkup(numpy.int64(0)) == expected
+    assert document.retrieveMarkup(numpy.float64(1)) == document.retrieveMarkup(1)
+
+
+def test_section_lookups_take_sequences(document, sentences, modifiers, targets):
+    # getXML looks up the markups of the tuple of section labels
+    tagIDs = counterTagIDs(start=100)
+    document.insertSection("IMPRESSION", setToParent=True)
+    document.insertSection("FINDINGS", setToParent=True)
+    document.addMarkup(markup_sentence(sentences[1], modifiers, targets, tagIDs=tagIDs))
+    labels = document.getDocumentSections()[1]
+    edges = document.getDocument().out_edges(labels, data=True)
+    expected = sorted((e[2]['sentenceNumber'], e[1]) for e in edges
+                      if e[2].get('category') == "markup")
+    assert document.getSectionMarkups(labels) == expected
+    assert document.getSectionNodes(("document", "IMPRESSION"), category="section") == \
+        ("IMPRESSION", "FINDINGS")
+    assert document.getXML().count("<section>") == 2
+
+
+def test_write_xml(document):
+    fp = io.StringIO()
+    document.writeXML(fp)
+    assert fp.getvalue() == document.getXML()
+    markup = get_markups(document)[0]
+    fp = io.StringIO()
+    markup.writeXML(fp)
+    assert fp.getvalue() == markup.getXML()
+    assert fp.getvalue().startswith("\n<ConTextMarkup>\n<rawText> No pulmonary embolism. </rawText>")
+
+
+def test_xml_scrub():
+    assert xmlScrub("a < b && c") == "a &lt; b &amp;&amp; c"
+    assert xmlScrub(["<no>"]) == "['&lt;no>']"
+
+
+def test_json_round_trip(document, sentences, modifiers, targets, xml_without_ids):
+    document.insertSection("IMPRESSION", setToParent=True)
+    document.addMarkup(markup_sentence(sentences[2], modifiers, targets,
+                                       tagIDs=counterTagIDs(start=100)))
+    fp = io.StringIO()
+    dump_documents([document, document], fp)
+    fp.seek(0)
+    loaded = list(load_documents(fp, markupClass=ConTextMarkupLite))
+    assert len(loaded) == 2
+    assert xml_without_ids(loaded[0]) == xml_without_ids(document)
+    # loaded tags get new ids
+    tags = [tag for d in loaded for m in d.getMarkups() for tag in m.nodes()]
+    assert len(set(tags)) == len(tags)
+    assert loaded[0].getDocumentText() == document.getDocumentText()
+    assert loaded[0].getCurrentparent() == "IMPRESSION"
+    assert [type(m) for m in loaded[0].getMarkups()] == [ConTextMarkupLite]*4
+    once = ConTextDocument.fromJSON(document.toJSON(), tagIDs=counterTagIDs())
+    twice = ConTextDocument.fromJSON(once.toJSON(), tagIDs=counterTagIDs())
+    assert twice.toDict() == once.toDict()
+
+
+def test_json_load_in_another_process(tmp_path, document, modifiers, targets):
+    import subprocess
+    import sys
+    path = tmp_path / "documents.jsonl"
+    with open(str(path), "w", encoding="utf-8") as fp:
+        dump_documents([document], fp)
+    # the tags of the file were numbered from 1 by this process; a new process
+    # loads them and marks up a new document with its own counter
+    script = ("import sys\n"
+              "from pyConTextNLP.io.json import load_documents\n"
+              "from pyConTextNLP.tagObject import counterTagIDs, tagObject\n"
+              "from pyConTextNLP.itemData import contextItem\n"
+              "loaded = list(load_documents(open(sys.argv[1], encoding='utf-8')))\n"
+              "new = [tagObject(contextItem(['x', 'X', '', '']), 'target') for i in range(50)]\n"
+              "tags = [t for d in loaded for m in d.getMarkups() for t in m.nodes()] + new\n"
+              "print(len(tags), len(set(tags)))\n")
+    output = subprocess.check_output([sys.executable, "-c", script, str(path)],
+                                     cwd=str(tmp_path), universal_newlines=True,
+                                     env=dict(os.environ, PYTHONPATH=ROOT))
+    total, unique = output.split()
+    assert total == unique
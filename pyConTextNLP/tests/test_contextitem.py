@@ -58,3 +58,39 @@ def test_contextItem_getRE1(items):
     cti = itemData.contextItem(items[0])
     assert cti.getRE() == r"""pulmonary\s(artery )?(embol[a-z]+)"""
 
+
+
+def test_contextItem_isLiteral(items):
+    assert itemData.contextItem(items[1]).isLiteral()
+
+
+def test_contextItem_isLiteral1(items):
+    assert not itemData.contextItem(items[0]).isLiteral()
+
+
+def test_contextItem_isLiteral2():
+    assert not itemData.contextItem(["r/o?", "INDICATION", "", "forward"]).isLiteral()
+
+
+def test_contextItem_parsedRule(items):
+    assert itemData.contextItem(items[1]).getParsedRule() is itemData.Rule.FORWARD
+    assert itemData.contextItem(items[0]).getParsedRule() is itemData.Rule.NONE
+
+
+def test_parse_rule():
+    assert itemData.parse_rule("backwards") is itemData.Rule.BACKWARD
+    assert itemData.parse_rule("bidirectional") is itemData.Rule.BIDIRECTIONAL
+    assert itemData.parse_rule("terminate") is itemData.Rule.TERMINATE
+    assert itemData.parse_rule(" ") is itemData.Rule.OTHER
+
+
+def test_compiledLexicon_pickle(items):
+    import pickle
+    lexicon = itemData.CompiledLexicon([itemData.contextItem(i) for i in items])
+    lexicon2 = pickle.loads(pickle.dumps(lexicon))
+    assert len(lexicon2) == 2
+    sentence = "no gross evidence of pulmonary artery embolism"
+    assert [(i.getLiteral(), [m.span() for m in matches])
+            for i, matches in lexicon2.getMatcher().finditems(sentence)] == \
+           [(i.getLiteral(), [m.span() for m in matches])
+            for i, matches in lexicon.getMatcher().finditems(sentence)]
@@ -43,3 +43,218 @@ def test_scrub_text(sent2):
     context.setRawText(sent2)
     context.cleanText(stripNonAlphaNumeric=True)
     assert context.getText().rfind(u'.') == -1
+
+def test_counter_tag_ids(sent2, items):
+    import pyConTextNLP.itemData as itemData
+    from pyConTextNLP.tagObject import counterTagIDs
+    context = ConTextMarkup(tagIDs=counterTagIDs())
+    context.setRawText(sent2)
+    context.cleanText()
+    context.markItems([itemData.contextItem(i) for i in items], mode="target")
+    assert sorted(n.getTagID() for n in context.nodes()) == [1, 2]
+
+def test_tag_id_strategy():
+    import pickle
+    from pyConTextNLP import tagObject
+    previous = tagObject.set_tag_id_strategy(tagObject.uuidTagIDs())
+    try:
+        assert tagObject.create_tag_id() > 2**64
+    finally:
+        tagObject.set_tag_id_strategy(previous)
+    counter = tagObject.counterTagIDs(5)
+    assert counter() == 5
+    copy = pickle.loads(pickle.dumps(counter))
+    # pickling does not advance the counter
+    assert counter() == 6
+    assert copy() == 6
+
+def test_tag_hash_consistent_with_eq(items):
+    import copy
+    import pyConTextNLP.itemData as itemData
+    from pyConTextNLP.tagObject import tagObject
+    item = itemData.contextItem(items[1])
+    tag1 = tagObject(item, "modifier", tagid=1)
+    tag2 = tagObject(item, "modifier", tagid=2)
+    tag1.setSpan((0, 5))
+    tag2.setSpan((0, 5))
+    assert tag1 != tag2
+    assert tag1.sameSpan(tag2)
+    tag3 = copy.copy(tag1)
+    assert tag3 == tag1 and hash(tag3) == hash(tag1)
+
+def pairwise_prune(marks):
+    """the former O(n^2) pruneMarks, kept as a reference"""
+    marks = sorted(marks)
+    nodes_to_remove = []
+    for i in range(len(marks)-1):
+        mark1 = marks[i]
+        if not any(mark1[0].sameSpan(node) for node in nodes_to_remove):
+            for j in range(i+1, len(marks)):
+                mark2 = marks[j]
+                if mark1[0].encompasses(mark2[0]) and \
+                   mark1[1]['category'] == mark2[1]['category']:
+                    nodes_to_remove.append(mark2[0])
+                elif mark2[0].encompasses(mark1[0]) and \
+                     mark2[1]['category'] == mark1[1]['category']:
+                    nodes_to_remove.append(mark1[0])
+                    break
+    return set(nodes_to_remove)
+
+def test_pruneMarks_matches_pairwise(items):
+    import random
+    import pyConTextNLP.itemData as itemData
+    from pyConTextNLP.tagObject import tagObject, counterTagIDs
+    item = itemData.contextItem(items[1])
+    rng = random.Random(42)
+    for trial in range(200):
+        tag_ids = counterTagIDs()
+        context = ConTextMarkup(tagIDs=tag_ids)
+        for k in range(rng.randint(0, 30)):
+            mode = rng.choice(["target", "modifier"])
+            tag = tagObject(item, mode, tagid=tag_ids())
+            start = rng.randint(0, 10)
+            tag.setSpan((start, start + rng.randint(0, 6)))
+            context.add_node(tag, category=mode)
+        removed = pairwise_prune(list(context.nodes(data=True)))
+        expected = [n for n in context.nodes() if n not in removed]
+        context.pruneMarks()
+        assert list(context.nodes()) == expected
+
+def pairwise_scopes_and_modifiers(markup):
+    """the former O(n^2) updateScopes and applyModifiers, kept as a reference"""
+    from pyConTextNLP.itemData import Rule
+    modifiers = markup.getConTextModeNodes("modifier")
+    for modifier in modifiers:
+        modifier.setScope()
+    for i in range(len(modifiers)-1):
+        modifier = modifiers[i]
+        for j in range(i+1, len(modifiers)):
+            modifier2 = modifiers[j]
+            if modifier.limitScope(modifier2) and \
+               modifier2.getParsedRule() is Rule.TERMINATE:
+                markup.add_edge(modifier2, modifier)
+            if modifier2.limitScope(modifier) and \
+               modifier.getParsedRule() is Rule.TERMINATE:
+                markup.add_edge(modifier, modifier2)
+    for target in markup.getConTextModeNodes("target"):
+        for modifier in modifiers:
+            if modifier.applyRule(target):
+                markup.add_edge(modifier, target)
+
+def test_applyModifiers_matches_pairwise():
+    import copy
+    import random
+    import pyConTextNLP.itemData as itemData
+    from pyConTextNLP.tagObject import tagObject, counterTagIDs
+    rng = random.Random(7)
+    rules = ["forward", "backward", "bidirectional", "terminate", ""]
+    categories = ["neg", "hist", "conj", "neg, hist"]
+    items = [itemData.contextItem(["m", category, "", rule])
+             for rule in rules for category in categories]
+    for trial in range(200):
+        tag_ids = counterTagIDs()
+        markups = [ConTextMarkup(tagIDs=tag_ids) for k in range(2)]
+        for markup in markups:
+            markup.setRawText("x"*80)
+            markup.cleanText()
+        for k in range(rng.randint(0, 25)):
+            mode = rng.choice(["target", "modifier", "modifier"])
+            tag = tagObject(rng.choice(items), mode, tagid=tag_ids(),
+                            scope=markups[0].getScope())
+            start = rng.randint(0, 70)
+            tag.setSpan((start, start + rng.randint(0, 8)))
+            markups[0].add_node(tag, category=mode)
+            markups[1].add_node(copy.copy(tag), category=mode)
+        pairwise_scopes_and_modifiers(markups[0])
+        markups[1].applyModifiers()
+        for node0, node1 in zip(markups[0].nodes(), markups[1].nodes()):
+            assert node0.getScope() == node1.getScope()
+            assert list(markups[0].successors(node0)) == list(markups[1].successors(node1))
+            assert list(markups[0].predecessors(node0)) == list(markups[1].predecessors(node1))
+        assert markups[0].getXML() == markups[1].getXML()
+
+def test_mode_index_follows_graph(items):
+    import random
+    import networkx as nx
+    import pyConTextNLP.itemData as itemData
+    from pyConTextNLP.tagObject import tagObject, counterTagIDs
+
+    def scan(markup, mode):
+        nodes = [n[0] for n in markup.nodes(data=True) if n[1].get('category') == mode]
+        nodes.sort()
+        return nodes
+
+    item = itemData.contextItem(items[1])
+    rng = random.Random(11)
+    tag_ids = counterTagIDs()
+    context = ConTextMarkup(tagIDs=tag_ids)
+    tags = []
+    for k in range(40):
+        tag = tagObject(item, "modifier", tagid=tag_ids())
+        start = rng.randint(0, 10)
+        tag.setSpan((start, start + 2))
+        tags.append(tag)
+    context.add_nodes_from(tags[:20], category="target")
+    context.add_node(tags[20], category="modifier")
+    context.add_nodes_from([(tag, {"category": "modifier"}) for tag in tags[21:30]])
+    context.add_edge(tags[0], tags[30])
+    context.add_nodes_from(tags[5:10], category="modifier")
+    context.remove_node(tags[1])
+    context.remove_nodes_from(tags[10:15] + tags[35:])
+    for markup in (context, context.copy(), nx.union(context, ConTextMarkup())):
+        for mode in ("target", "modifier", None):
+            assert markup.getConTextModeNodes(mode) == scan(markup, mode)
+        assert markup.getNumMarkedTargets() == len(scan(markup, "target"))
+    context.clear()
+    assert context.getConTextModeNodes("target") == []
+
+def test_json_round_trip():
+    import random
+    import pyConTextNLP.itemData as itemData
+    from pyConTextNLP.ConTextMarkupLite import ConTextMarkupLite
+    from pyConTextNLP.tagObject import tagObject, counterTagIDs
+    rng = random.Random(3)
+    items = [itemData.contextItem(["m", category, regex, rule])
+             for rule in ["forward", "backward", "terminate", ""]
+             for category in ["neg", "neg, hist"] for regex in ["", "(?P<m>m+)"]]
+    for trial in range(50):
+        tag_ids = counterTagIDs()
+        markup = ConTextMarkup(tagIDs=tag_ids)
+        markup.setRawText("x <&> "*15)
+        markup.cleanText()
+        for k in range(rng.randint(0, 20)):
+            mode = rng.choice(["target", "modifier"])
+            tag = tagObject(rng.choice(items), mode, tagid=tag_ids(),
+                            scope=markup.getScope())
+            start = rng.randint(0, 80)
+            tag.setSpan((start, start + rng.randint(0, 8)))
+            tag.setPhrase(markup.getText()[start:start+8])
+            if rng.random() < 0.2:
+                tag.setMatchedGroupDictionary({"m": "mm"})
+            if rng.random() < 0.2:
+                tag.replaceCategory("neg", "negated")
+            markup.add_node(tag, category=mode)
+        markup.applyModifiers()
+        for cls in (ConTextMarkup, ConTextMarkupLite):
+            # a new counter gives the tags their original ids back
+            loaded = cls.fromJSON(markup.toJSON(), tagIDs=counterTagIDs())
+            assert loaded.getXML() == markup.getXML()
+            assert loaded.toDict() == markup.toDict()
+            for node in markup.nodes():
+                assert list(loaded.predecessors(node)) == list(markup.predecessors(node))
+                assert loaded.isModifiedByCategory(node, "negated") == \
+                    markup.isModifiedByCategory(node, "negated")
+
+
+def test_mode_nodes_of_views(modifiers, targets):
+    from pyConTextNLP.pipeline import markup_sentence
+    markup = markup_sentence("No evidence of pulmonary embolism or pneumonia.", modifiers, targets)
+    expected = markup.getMarkedTargets()
+    assert len(expected) == 2
+    views = [markup.subgraph(list(markup.nodes())), markup.reverse(copy=False),
+             markup.copy(as_view=True)]
+    for view in views:
+        assert view.getMarkedTargets() == expected
+        assert view.getNumMarkedTargets() == 2
+        assert view.getConTextModeNodes("modifier") == markup.getConTextModeNodes("modifier")
+    assert markup.subgraph(expected[:1]).getMarkedTargets() == expected[:1]
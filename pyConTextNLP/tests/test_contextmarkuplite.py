@@ -0,0 +1,67 @@
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.ConTextMarkupLite import ConTextMarkupLite
+from pyConTextNLP.pipeline import markup_sentence
+from pyConTextNLP.pyConText import ConTextDocument
+from pyConTextNLP.tagObject import counterTagIDs
+import networkx as nx
+import pytest
+
+@pytest.fixture(scope="module")
+def sentences():
+    return ['IMPRESSION: 1. LIMITED STUDY DEMONSTRATING NO GROSS EVIDENCE OF SIGNIFICANT PULMONARY EMBOLISM.',
+            'No pulmonary embolism, but pulmonary embolism cannot be excluded. No pneumonia.',
+            'There is no evidence of pulmonary embolism or pneumonia to suggest pulmonary artery embolus.']
+
+
+def test_lite_matches_networkx_markup(sentences, modifiers, targets):
+    for s in sentences:
+        markup = markup_sentence(s, modifiers, targets, markup_class=ConTextMarkup,
+                                 tagIDs=counterTagIDs())
+        lite = markup_sentence(s, modifiers, targets, markup_class=ConTextMarkupLite,
+                               tagIDs=counterTagIDs())
+        assert lite.getXML() == markup.getXML()
+        assert [t.getSpan() for t in lite.getMarkedTargets()] == \
+               [t.getSpan() for t in markup.getMarkedTargets()]
+        for t1, t2 in zip(lite.getMarkedTargets(), markup.getMarkedTargets()):
+            assert lite.isModifiedByCategory(t1, "definite_negated_existence") == \
+                   markup.isModifiedByCategory(t2, "definite_negated_existence")
+
+
+def test_lite_toDiGraph(sentences, modifiers, targets):
+    lite = markup_sentence(sentences[1], modifiers, targets, markup_class=ConTextMarkupLite,
+                           tagIDs=counterTagIDs())
+    graph = lite.toDiGraph()
+    assert isinstance(graph, nx.DiGraph)
+    assert list(graph.nodes(data=True)) == lite.nodes(data=True)
+    assert list(graph.edges()) == lite.edges()
+    assert graph.getText() == lite.getText()
+
+
+def test_lite_edges_of_nbunch(sentences, modifiers, targets):
+    lite = markup_sentence(sentences[1], modifiers, targets, markup_class=ConTextMarkupLite,
+                           tagIDs=counterTagIDs())
+    graph = lite.toDiGraph()
+    modifiers = lite.getConTextModeNodes("modifier")
+    assert lite.edges(modifiers[0]) == list(graph.edges(modifiers[0]))
+    assert lite.edges([modifiers[0]]) == list(graph.edges([modifiers[0]]))
+    assert lite.edges(modifiers, data=True) == list(graph.edges(modifiers, data=True))
+    assert lite.edges(modifiers)
+    assert [] not in lite
+
+
+def test_lite_remove_nodes(sentences, modifiers, targets):
+    lite = markup_sentence(sentences[1], modifiers, targets, markup_class=ConTextMarkupLite,
+                           tagIDs=counterTagIDs())
+    modifiers = lite.getConTextModeNodes("modifier")
+    lite.remove_nodes_from(modifiers)
+    assert lite.number_of_edges() == 0
+    assert not lite.getConTextModeNodes("modifier")
+
+
+def test_lite_document_graph(sentences, modifiers, targets):
+    document = ConTextDocument()
+    tagIDs = counterTagIDs()
+    for s in sentences:
+        document.addMarkup(markup_sentence(s, modifiers, targets, markup_class=ConTextMarkupLite,
+                                           tagIDs=tagIDs))
+    assert document.getDocumentGraph().number_of_nodes() > 0
@@ -29,3 +29,19 @@ def test_deleteExceptionTermsWithoutCaseVariants(splitter):
     splitter.deleteExceptionTerms("M.D.")
     assert ("M.D." not in splitter.getExceptionTerms())
     assert ("m.d." in splitter.getExceptionTerms())
+
+
+def test_splitSentences():
+    splitter = helpers.sentenceSplitter()
+    txt = "Seen by Dr. Smith.  No pneumonia!\nIs the value 1.43 ? trailing words"
+    assert splitter.splitSentences(txt) == ["Seen by Dr. Smith.", "No pneumonia!",
+                                            "Is the value 1.43 ?", "trailing words"]
+
+
+def test_sentenceSpans():
+    splitter = helpers.sentenceSplitter()
+    txt = "  Seen by Dr. Smith.  No\tpneumonia!\n"
+    spans = list(splitter.sentenceSpans(txt))
+    assert spans == [(2, 20), (22, 35)]
+    assert [txt[s:e] for s, e in spans] == ["Seen by Dr. Smith.", "No\tpneumonia!"]
+    assert list(splitter.sentenceSpans(" \n ")) == []
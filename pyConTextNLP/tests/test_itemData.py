@@ -23,3 +23,110 @@ def test_get_fileobj_3():
     yfo = itemData.get_fileobj(
             "https://raw.githubusercontent.com/chapmanbe/pyConTextNLP/master/KB/test.yml")
     assert yfo
+
+
+LEXICON = """Comments: ''
+Direction: forward
+Lex: 'no'
+Regex: ''
+Type: DEFINITE_NEGATED_EXISTENCE
+---
+Comments: ''
+Direction: backward
+Lex: ruled out
+Regex: 'ruled\\s+out'
+Type: DEFINITE_NEGATED_EXISTENCE
+"""
+
+
+def test_get_items_cache(tmp_path):
+    kb = tmp_path / "kb.yml"
+    kb.write_text(LEXICON)
+    cache_dir = str(tmp_path / "cache")
+    items = itemData.get_items(str(kb))
+    assert [str(i) for i in itemData.get_items(str(kb), cache_dir=cache_dir)] == \
+        [str(i) for i in items]
+    assert len(os.listdir(cache_dir)) == 1
+    cached = itemData.get_items(str(kb), cache_dir=cache_dir)
+    assert [str(i) for i in cached] == [str(i) for i in items]
+    assert cached[1].getRE() == r"ruled\s+out"
+
+    # a changed lexicon is parsed again
+    kb.write_text(LEXICON.replace("Lex: 'no'", "Lex: without"))
+    assert itemData.get_items(str(kb), cache_dir=cache_dir)[0].getLiteral() == "without"
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_get_lexicon_cache(tmp_path):
+    kb = tmp_path / "kb.yml"
+    kb.write_text(LEXICON)
+    cache_dir = str(tmp_path / "cache")
+    for k in range(2):
+        lexicon = itemData.get_lexicon(str(kb), cache_dir=cache_dir)
+        assert isinstance(lexicon, itemData.CompiledLexicon)
+        assert [i.getLiteral() for i, m in lexicon.getMatcher().finditems("it was ruled  out")] == \
+            ["ruled out"]
+
+
+def test_iter_items(tmp_path):
+    kb = tmp_path / "kb.yml"
+    kb.write_text(LEXICON + "---\n")
+    items = itemData.iter_items(str(kb))
+    assert not isinstance(items, list)
+    assert [str(i) for i in items] == [str(i) for i in itemData.get_items(str(kb))]
+    assert [i.getLiteral() for i in itemData.get_items(str(kb))] == ["no", "ruled out"]
+
+
+def test_iter_items_validates_keys(tmp_path):
+    kb = tmp_path / "kb.yml"
+    kb.write_text(LEXICON + "---\nLex: rule out\nType: INDICATION\n")
+    items = itemData.iter_items(str(kb))
+    assert next(items).getLiteral() == "no"
+    with pytest.raises(ValueError, match="document 2 .* lacks Regex, Direction"):
+        list(items)
+    kb.write_text("- Lex\n- Type\n")
+    with pytest.raises(ValueError, match="not a mapping"):
+        itemData.get_items(str(kb))
+
+
+def test_get_items_is_safe(tmp_path):
+    kb = tmp_path / "kb.yml"
+    kb.write_text(LEXICON.replace("Lex: 'no'", "Lex: !!python/object/apply:os.getcwd []"))
+    with pytest.raises(itemData.yaml.YAMLError):
+        itemData.get_items(str(kb))
+
+
+def test_get_csv_items_matches_yaml():
+    kb = PurePath(PurePath(os.path.abspath(__file__)).parent, "..", "..", "KB")
+    for name in ("utah_crit", "lexical_kb_05042016"):
+        assert [str(i) for i in itemData.get_csv_items(str(PurePath(kb, name+".tsv")))] == \
+            [str(i) for i in itemData.get_items(str(PurePath(kb, name+".yml")))]
+
+
+def test_get_csv_items(tmp_path):
+    kb = tmp_path / "kb.csv"
+    kb.write_text("Type,Lex,Comments,Regex,Direction\n"
+                  "DEFINITE_NEGATED_EXISTENCE,no,,,forward\n"
+                  "\n"
+                  "INDICATION,\"rule out, r/o\",,,\n"
+                  "INDICATION,evaluate,,\n")
+    items = itemData.get_csv_items(str(kb))
+    assert [(i.getLiteral(), i.getCategory(), i.getRule()) for i in items] == \
+        [("no", ["definite_negated_existence"], "forward"),
+         ("rule out, r/o", ["indication"], ""),
+         ("evaluate", ["indication"], "")]
+    assert [str(i) for i in itemData.iter_csv_items(str(kb))] == [str(i) for i in items]
+    kb.write_text("Lex,Type\nno,DEFINITE_NEGATED_EXISTENCE\n")
+    with pytest.raises(ValueError, match="lacks Regex, Direction"):
+        itemData.get_csv_items(str(kb))
+
+
+def test_instantiateFromCSVtoitemData(tmp_path):
+    kb = tmp_path / "kb.tsv"
+    kb.write_text("Lex\tType\tRegex\tDirection\n"
+                  "no\tDEFINITE_NEGATED_EXISTENCE\t\tforward\n"
+                  "#NAME?\tDEFINITE_NEGATED_EXISTENCE\t\tforward\n"
+                  "\tINDICATION\t\t\n"
+                  "r/o\tINDICATION\n")
+    items = itemData.instantiateFromCSVtoitemData(str(kb))
+    assert [(i.getLiteral(), i.getRule()) for i in items] == [("no", "forward"), ("r/o", "")]
@@ -0,0 +1,130 @@
+import re
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.matcher import ItemMatcher, LiteralTrie, RegexCache, get_item_regex
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+import pytest
+
+@pytest.fixture(scope="module")
+def items():
+    return [itemData.contextItem(i) for i in
+            [["pulmonary embolism",
+              "PULMONARY_EMBOLISM",
+              r"""pulmonary\s(artery )?(embol[a-z]+)""",
+              ""],
+             ["no gross evidence of",
+              "PROBABLE_NEGATED_EXISTENCE",
+              "",
+              "forward"],
+             ["NO",
+              "DEFINITE_NEGATED_EXISTENCE",
+              "",
+              "forward"],
+             ["size",
+              "INDICATION",
+              r"""(?P<size>\d+(\.\d+)?)\s?cm""",
+              "forward"],
+             ["anything",
+              "INDICATION",
+              r""".ny[a-z]+""",
+              "forward"]]]
+
+@pytest.fixture(scope="module")
+def sentences():
+    return ['IMPRESSION: 1. LIMITED STUDY DEMONSTRATING NO GROSS EVIDENCE OF SIGNIFICANT PULMONARY EMBOLISM.',
+            'no no no evidence of a 2.5 cm pulmonary artery embolus or anything else',
+            'Kelvin sign K and long s ſ are matched case insensitively',
+            '']
+
+
+def test_finditems_matches_finditer(items, sentences):
+    matcher = ItemMatcher(items)
+    for sentence in sentences:
+        found = dict((item.getLiteral(), matches) for item, matches in matcher.finditems(sentence))
+        for item in items:
+            regex = re.compile(get_item_regex(item), re.IGNORECASE|re.UNICODE)
+            expected = [(m.span(), m.group(), m.groupdict()) for m in regex.finditer(sentence)]
+            assert [(m.span(), m.group(), m.groupdict())
+                    for m in found.get(item.getLiteral(), [])] == expected
+
+
+def test_finditems_item_order(items, sentences):
+    matcher = ItemMatcher(items)
+    assert [i.getLiteral() for i, m in matcher.finditems(sentences[1])] == \
+        ["pulmonary embolism", "NO", "size", "anything"]
+
+
+def test_literal_trie():
+    trie = LiteralTrie(["no", "no evidence", "evidence", "k"])
+    found = sorted(trie.finditer("No evidence; NO-no nothing \u212a"))
+    assert found == [(0, 0, 2), (0, 13, 15), (0, 16, 18), (1, 0, 11), (2, 3, 11), (3, 27, 28)]
+
+
+def test_literal_trie_case_sensitive():
+    trie = LiteralTrie(["no"], ignoreCase=False)
+    assert list(trie.finditer("No no")) == [(0, 3, 5)]
+
+
+def test_markItems_with_matcher(items, sentences):
+    context = ConTextMarkup()
+    context.setRawText(sentences[1])
+    context.cleanText()
+    context.markItems(items, mode="modifier")
+    expected = sorted((n.getSpan(), n.getPhrase()) for n in context.nodes())
+
+    context = ConTextMarkup()
+    context.setRawText(sentences[1])
+    context.cleanText()
+    context.markItems(ItemMatcher(items), mode="modifier")
+    assert sorted((n.getSpan(), n.getPhrase()) for n in context.nodes()) == expected
+
+
+def test_regex_cache_keyed_on_flags():
+    cache = RegexCache()
+    r1 = cache.compile(r"\bno\b", re.IGNORECASE)
+    r2 = cache.compile(r"\bno\b")
+    assert r1 is not r2
+    assert cache.compile(r"\bno\b", re.IGNORECASE) is r1
+    assert (cache.getHits(), cache.getMisses()) == (1, 2)
+
+
+def test_regex_cache_lru_eviction():
+    cache = RegexCache(maxsize=2)
+    cache.compile("a")
+    cache.compile("b")
+    cache.compile("a")
+    cache.compile("c")
+    assert len(cache) == 2
+    assert ("a", 0) in cache
+    assert ("b", 0) not in cache
+
+
+def test_markItems_with_scoped_cache(items, sentences):
+    cache = RegexCache()
+    context = ConTextMarkup()
+    context.setRawText(sentences[1])
+    context.cleanText()
+    context.markItems(items, mode="modifier", cache=cache)
+    assert cache.getMisses() == len(items)
+
+
+def test_anchors(items):
+    matcher = ItemMatcher(items)
+    assert matcher.getAnchors() == ["pulmonary", None, None, None, None]
+    matcher = ItemMatcher([itemData.contextItem(["x", "X", regex, ""]) for regex in
+                           [r"(?>abc)d", r"ev(id)+ence", r"evi(de)?nce", r"a\bb", r"(st)*op s"]])
+    assert matcher.getAnchors() == ["abcd", "evid", "evi", None, "op s"]
+
+
+def test_anchored_items_match_finditer():
+    items = [itemData.contextItem([str(i), "X", regex, ""]) for i, regex in
+             enumerate([r"\bkelvin\b", r"ſtop", r"sto+p", r"(?<=a )mass", r"mass(?=es)"])]
+    matcher = ItemMatcher(items)
+    sentence = "KELVIN Kelvin ſtop stooop a masses"
+    assert matcher.getAnchoredItems(sentence) == [0, 1, 2, 3, 4]
+    assert matcher.getAnchoredItems("stop the mass") == [1, 2, 3, 4]
+    assert matcher.getAnchoredItems("no anchors here") == []
+    found = dict((item.getLiteral(), matches) for item, matches in matcher.finditems(sentence))
+    for item in items:
+        regex = re.compile(get_item_regex(item), re.IGNORECASE|re.UNICODE)
+        assert [m.span() for m in found.get(item.getLiteral(), [])] == \
+            [m.span() for m in regex.finditer(sentence)]
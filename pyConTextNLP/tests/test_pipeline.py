@@ -0,0 +1,50 @@
+import pyConTextNLP.itemData as itemData
+from pyConTextNLP.ConTextMarkup import ConTextMarkup
+from pyConTextNLP.ConTextMarkupLite import ConTextMarkupLite
+from pyConTextNLP.pipeline import markup_document, markup_sentence
+from pyConTextNLP.tagObject import counterTagIDs
+import pytest
+
+@pytest.fixture(scope="module")
+def sentences():
+    return ['IMPRESSION: 1. LIMITED STUDY DEMONSTRATING NO GROSS EVIDENCE OF SIGNIFICANT PULMONARY EMBOLISM.',
+            'No pulmonary embolism, but pulmonary embolism cannot be excluded. No pneumonia.',
+            'There is no evidence of pulmonary embolism or chronic pneumonia to suggest pulmonary artery embolus.',
+            'No history of free air.']
+
+
+@pytest.mark.parametrize("cls", [ConTextMarkup, ConTextMarkupLite])
+@pytest.mark.parametrize("prune_inactive", [True, False])
+@pytest.mark.parametrize("drop_category", ["exclusion", None])
+def test_markup_sentence_matches_stepwise(sentences, modifiers, targets, stepwise_markup,
+                                          cls, prune_inactive, drop_category):
+    lexicons = [(modifiers, targets),
+                (itemData.CompiledLexicon(modifiers), itemData.CompiledLexicon(targets))]
+    for s in sentences:
+        expected = stepwise_markup(s, modifiers, targets, cls, prune_inactive, drop_category)
+        for mods, tgts in lexicons:
+            markup = markup_sentence(s, mods, tgts, prune_inactive=prune_inactive,
+                                     drop_category=drop_category, markup_class=cls,
+                                     tagIDs=counterTagIDs())
+            assert isinstance(markup, cls)
+            assert markup.getXML() == expected.getXML()
+
+
+def test_markup_sentence_drops_category(sentences, modifiers, targets):
+    markup = markup_sentence(sentences[2], modifiers, targets)
+    assert not [t for t in markup.getMarkedTargets() if t.isA("exclusion")]
+    markup = markup_sentence(sentences[2], modifiers, targets, drop_category=None)
+    assert [t for t in markup.getMarkedTargets() if t.isA("exclusion")]
+
+
+def test_markup_document_tags_unique_across_documents(modifiers, targets):
+    documents = [markup_document("There is no pneumonia.", modifiers, targets),
+                 markup_document("Pulmonary embolism is present.", modifiers, targets)]
+    tags = [tag for document in documents for markup in document.getMarkups()
+            for tag in markup.nodes()]
+    assert len(tags) == 3
+    assert len(set(tags)) == 3
+    # per-document counters are opt-in
+    document = markup_document("There is no pneumonia.", modifiers, targets,
+                               tagIDs=counterTagIDs())
+    assert sorted(tag.getTagID() for tag in document.getMarkups()[0].nodes()) == [1, 2]
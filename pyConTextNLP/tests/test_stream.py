@@ -0,0 +1,51 @@
+import csv
+import json
+from pyConTextNLP import stream
+from pyConTextNLP.pipeline import markup_document
+import pytest
+
+@pytest.fixture(scope="module")
+def reports():
+    return [("r1", 'No pulmonary embolism. There is pneumonia.'),
+            ("r2", ''),
+            ("r3", 'Pulmonary embolism cannot be excluded.')]
+
+
+def test_read_jsonl(tmp_path, reports):
+    path = tmp_path / "reports.jsonl"
+    path.write_text("\n".join(json.dumps({"id":i, "report":t}) for i, t in reports))
+    assert list(stream.read_jsonl(str(path), text_key="report", id_key="id")) == reports
+    assert [i for i, t in stream.read_jsonl(str(path), text_key="report")] == [0, 1, 2]
+
+
+def test_read_csv(tmp_path, reports):
+    path = tmp_path / "reports.tsv"
+    with open(str(path), "w", newline="") as f0:
+        writer = csv.writer(f0, delimiter="\t")
+        writer.writerow(["id", "text"])
+        writer.writerows(reports)
+    assert list(stream.read_csv(str(path), id_column="id", delimiter="\t")) == reports
+
+
+def test_findings(reports, modifiers, targets):
+    results = stream.findings(markup_document(reports[0][1], modifiers, targets))
+    assert [(f["sentence"], f["phrase"], f["category"]) for f in results] == \
+           [(0, "pulmonary embolism", ["pulmonary_embolism"]), (1, "pneumonia", ["pneumonia"])]
+    assert [m["category"] for m in results[0]["modifiers"]] == [["definite_negated_existence"]]
+    assert results[1]["modifiers"] == []
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_stream(reports, modifiers, targets, workers):
+    results = list(stream.stream(iter(reports), modifiers, targets, extract=stream.findings,
+                                 workers=workers, chunksize=1, max_in_flight=1))
+    assert [r[0] for r in results] == ["r1", "r2", "r3"]
+    assert results[1][1] == []
+    assert results[2][1][0]["modifiers"][0]["category"] == ["ambivalent_existence"]
+
+
+def test_stream_texts(reports, modifiers, targets, xml_without_ids):
+    results = list(stream.stream([t for i, t in reports], modifiers, targets, workers=0))
+    assert [r[0] for r in results] == [0, 1, 2]
+    assert xml_without_ids(results[0][1]) == \
+        xml_without_ids(markup_document(reports[0][1], modifiers, targets))
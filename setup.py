@@ -80,6 +80,9 @@ setup(
     extras_require = {
         'dev': ['check-manifest'],
         'test': ['coverage'],
+        # columnar export of findings (pyConTextNLP.columnar)
+        'arrow': ['pyarrow'],
+        'npz': ['numpy'],
     },
 
     # If there are data files included in your packages that need to be